@@ -0,0 +1,108 @@
+from .archive import NewsletterArchive
+from .batch import build_batch_requests, collect_batch, submit_batch, wait_for_batch
+from .cache import ResponseCache
+from .client import LimitedClient, RateLimiter, get_client, get_limiter
+from .dedup import InsightIndex, get_insight_index
+from .email_format import format_email, newsletter_slug
+from .export import EXPORTERS, export_archive, export_newsletter, register_exporter, start_archive_export
+from .generation import (
+    MAX_TOKENS,
+    MODEL,
+    SECTIONS,
+    build_newsletter,
+    generate_newsletter,
+    generate_section,
+    iter_section_events,
+    recent_titles,
+    regenerate_insight,
+    stream_section,
+)
+from .jobs import JobQueue, get_job_queue
+from .metrics import RunMetrics, elapsed_ms, format_usage, summarize, sum_usage, to_json, to_prometheus, usage_dict
+from .parsing import InsightStreamParser, parse_insights, validate_insight
+from .prompts import (
+    AI_TOPIC_OPTIONS,
+    DEFAULT_AI_TOPICS,
+    DEFAULT_PM_TOPICS,
+    PM_TOPIC_OPTIONS,
+    build_ai_request,
+    build_duplicate_request,
+    build_item_request,
+    build_pm_request,
+    build_refine_request,
+    build_repair_request,
+    build_requests,
+)
+from .rendering import article_blocks, content_key, render_newsletter
+from .routing import MODELS, estimate_run, max_tokens_for, route_requests
+from .schedule import Scheduler, get_scheduler, next_issue_date
+from .teams import load_teams, resolve_team, team_slug
+
+__all__ = [
+    "AI_TOPIC_OPTIONS",
+    "DEFAULT_AI_TOPICS",
+    "DEFAULT_PM_TOPICS",
+    "EXPORTERS",
+    "InsightIndex",
+    "InsightStreamParser",
+    "JobQueue",
+    "LimitedClient",
+    "MAX_TOKENS",
+    "MODEL",
+    "MODELS",
+    "NewsletterArchive",
+    "PM_TOPIC_OPTIONS",
+    "RateLimiter",
+    "ResponseCache",
+    "RunMetrics",
+    "SECTIONS",
+    "Scheduler",
+    "article_blocks",
+    "build_ai_request",
+    "build_batch_requests",
+    "build_duplicate_request",
+    "build_item_request",
+    "build_newsletter",
+    "build_pm_request",
+    "build_refine_request",
+    "build_repair_request",
+    "build_requests",
+    "collect_batch",
+    "content_key",
+    "elapsed_ms",
+    "estimate_run",
+    "export_archive",
+    "export_newsletter",
+    "format_email",
+    "format_usage",
+    "generate_newsletter",
+    "generate_section",
+    "get_client",
+    "get_insight_index",
+    "get_job_queue",
+    "get_limiter",
+    "get_scheduler",
+    "iter_section_events",
+    "load_teams",
+    "max_tokens_for",
+    "newsletter_slug",
+    "next_issue_date",
+    "parse_insights",
+    "recent_titles",
+    "regenerate_insight",
+    "register_exporter",
+    "render_newsletter",
+    "resolve_team",
+    "route_requests",
+    "start_archive_export",
+    "stream_section",
+    "submit_batch",
+    "sum_usage",
+    "summarize",
+    "team_slug",
+    "to_json",
+    "to_prometheus",
+    "usage_dict",
+    "validate_insight",
+    "wait_for_batch",
+]
@@ -0,0 +1,353 @@
+import json
+import re
+from datetime import datetime
+
+from . import config
+from .db import connect, ensure_parent_dir
+from .dedup import get_insight_index
+from .storage import decode_body, decode_topics, encode_body, encode_topics, get_string_table
+
+SUMMARY_COLUMNS = "id, date, timestamp, ai_topics, pm_topics, ai_count, pm_count"
+
+# Relative bm25 weights of the indexed columns, in the order they are declared
+SEARCH_WEIGHTS = (10.0, 4.0, 2.0, 1.0, 2.0, 3.0)
+
+
+def issue_date(newsletter):
+    # The display date ("May 01, 2025") as ISO, so date ranges compare as text
+    try:
+        return datetime.strptime(newsletter["date"], "%B %d, %Y").date().isoformat()
+    except (KeyError, ValueError):
+        return None
+
+
+def search_rows(newsletter_id, newsletter):
+    topics = " ".join(newsletter.get("ai_topics", []) + newsletter.get("pm_topics", []))
+    return [
+        (
+            article.get("title", ""),
+            article.get("key_insight", ""),
+            article.get("why_it_matters", ""),
+            " ".join(article.get("action_items", [])),
+            " ".join(article.get("search_terms", [])),
+            topics,
+            newsletter_id,
+            section,
+            position,
+        )
+        for section in ("ai", "pm")
+        for position, article in enumerate(newsletter.get(f"{section}_articles", []))
+    ]
+
+
+def match_query(text):
+    # Every word must appear, as a prefix; quoting keeps FTS5 operators in user input literal
+    words = re.findall(r"\w+", text.lower())
+    return " ".join(f'"{word}"*' for word in words)
+
+
+class NewsletterArchive:
+    """SQLite-backed archive of generated newsletters.
+
+    Listing only reads the small summary columns; the full article bodies
+    are loaded one newsletter at a time with ``get``. Bodies are stored
+    compressed, with topics and sources interned in a shared string table
+    (see ``storage``), and are decompressed only when loaded.
+    """
+
+    def __init__(self, path=config.ARCHIVE_PATH):
+        self.path = path
+        ensure_parent_dir(path)
+        self.strings = get_string_table(path)
+        with connect(self.path) as conn:
+            # WAL lets several app sessions read while one of them writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS newsletters ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " date TEXT NOT NULL,"
+                " timestamp TEXT NOT NULL,"
+                " ai_topics TEXT NOT NULL,"
+                " pm_topics TEXT NOT NULL,"
+                " ai_count INTEGER NOT NULL,"
+                " pm_count INTEGER NOT NULL,"
+                " body BLOB NOT NULL,"
+                " issue_date TEXT,"
+                # Issues pre-generated for a saved configuration stay drafts until published
+                " config_name TEXT,"
+                " draft INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_newsletters_date ON newsletters (date)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_newsletters_timestamp ON newsletters (timestamp)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_newsletters_issue_date ON newsletters (issue_date)")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_newsletters_config ON newsletters (config_name, issue_date)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS newsletter_topics ("
+                " newsletter_id INTEGER NOT NULL,"
+                " section TEXT NOT NULL,"
+                " topic TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_topics_topic ON newsletter_topics (topic, newsletter_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_topics_newsletter ON newsletter_topics (newsletter_id)")
+            # Inverted index with one row per insight
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS insight_search USING fts5("
+                " title, key_insight, why_it_matters, action_items, search_terms, topics,"
+                " newsletter_id UNINDEXED, section UNINDEXED, position UNINDEXED,"
+                " tokenize = 'porter unicode61')"
+            )
+            # Kept when a newsletter is deleted so performance history stays intact
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS run_metrics ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " newsletter_id INTEGER,"
+                " timestamp TEXT NOT NULL,"
+                " data TEXT NOT NULL)"
+            )
+        # Similarity index over the archived insights, kept in step by add/delete
+        self.insights = get_insight_index(path)
+
+    def add(self, newsletter):
+        body = encode_body(newsletter, self.strings)
+        ai_topics = encode_topics(newsletter.get("ai_topics", []), self.strings)
+        pm_topics = encode_topics(newsletter.get("pm_topics", []), self.strings)
+        with connect(self.path) as conn:
+            cursor = conn.execute(
+                "INSERT INTO newsletters"
+                " (date, timestamp, ai_topics, pm_topics, ai_count, pm_count, body, issue_date, config_name, draft)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    newsletter["date"],
+                    newsletter["timestamp"],
+                    ai_topics,
+                    pm_topics,
+                    len(newsletter.get("ai_articles", [])),
+                    len(newsletter.get("pm_articles", [])),
+                    body,
+                    issue_date(newsletter),
+                    newsletter.get("config_name"),
+                    int(bool(newsletter.get("draft"))),
+                )
+            )
+            newsletter_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO newsletter_topics (newsletter_id, section, topic) VALUES (?, ?, ?)",
+                [(newsletter_id, "ai", topic) for topic in newsletter.get("ai_topics", [])]
+                + [(newsletter_id, "pm", topic) for topic in newsletter.get("pm_topics", [])]
+            )
+            conn.executemany(
+                "INSERT INTO insight_search VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                search_rows(newsletter_id, newsletter)
+            )
+            if newsletter.get("metrics"):
+                conn.execute(
+                    "INSERT INTO run_metrics (newsletter_id, timestamp, data) VALUES (?, ?, ?)",
+                    (newsletter_id, newsletter["timestamp"], json.dumps(newsletter["metrics"]))
+                )
+        newsletter["id"] = newsletter_id
+        self.insights.add(newsletter)
+        return newsletter_id
+
+    @staticmethod
+    def _filters(topic=None, date_from=None, date_to=None):
+        # Conditions on the newsletters table, usable on its own or joined with insight_search;
+        # drafts are not issues yet, so listing, counting and search leave them out
+        conditions = ["newsletters.draft = 0"]
+        params = []
+        if topic is not None:
+            conditions.append("newsletters.id IN (SELECT newsletter_id FROM newsletter_topics WHERE topic = ?)")
+            params.append(topic)
+        if date_from is not None:
+            conditions.append("newsletters.issue_date >= ?")
+            params.append(date_from)
+        if date_to is not None:
+            conditions.append("newsletters.issue_date <= ?")
+            params.append(date_to)
+        return conditions, params
+
+    def update(self, newsletter):
+        """Saves an edited newsletter in place, keeping its id, topics and run metrics.
+
+        Returns False, without saving anything, if the newsletter has been deleted meanwhile.
+        """
+        newsletter_id = newsletter["id"]
+        body = encode_body(newsletter, self.strings)
+        with connect(self.path) as conn:
+            cursor = conn.execute(
+                "UPDATE newsletters SET ai_count = ?, pm_count = ?, body = ? WHERE id = ?",
+                (
+                    len(newsletter.get("ai_articles", [])),
+                    len(newsletter.get("pm_articles", [])),
+                    body,
+                    newsletter_id,
+                )
+            )
+            if cursor.rowcount == 0:
+                return False
+            conn.execute("DELETE FROM insight_search WHERE newsletter_id = ?", (newsletter_id,))
+            conn.executemany(
+                "INSERT INTO insight_search VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                search_rows(newsletter_id, newsletter)
+            )
+        self.insights.remove(newsletter_id)
+        self.insights.add(newsletter)
+        return True
+
+    def publish(self, newsletter_id):
+        """Turns a draft into a regular archived issue and returns it."""
+        newsletter = self.get(newsletter_id)
+        newsletter.pop("draft", None)
+        body = encode_body(newsletter, self.strings)
+        with connect(self.path) as conn:
+            conn.execute("UPDATE newsletters SET draft = 0, body = ? WHERE id = ?", (body, newsletter_id))
+        self.insights.add(newsletter)
+        return newsletter
+
+    def drafts(self, config_name=None):
+        """Unpublished drafts, latest issue first, optionally only those of one saved configuration."""
+        query = "SELECT id, config_name, date, issue_date, timestamp FROM newsletters WHERE draft = 1"
+        params = []
+        if config_name is not None:
+            query += " AND config_name = ?"
+            params.append(config_name)
+        with connect(self.path) as conn:
+            rows = conn.execute(query + " ORDER BY issue_date DESC, id DESC", params).fetchall()
+        return [
+            {"id": row[0], "config_name": row[1], "date": row[2], "issue_date": row[3], "timestamp": row[4]}
+            for row in rows
+        ]
+
+    def has_issue(self, config_name, issue):
+        """Whether a draft or published newsletter exists for a saved configuration's issue (ISO date)."""
+        with connect(self.path) as conn:
+            return conn.execute(
+                "SELECT 1 FROM newsletters WHERE config_name = ? AND issue_date = ? LIMIT 1", (config_name, issue)
+            ).fetchone() is not None
+
+    def count(self, topic=None, date_from=None, date_to=None):
+        conditions, params = self._filters(topic, date_from, date_to)
+        where = " WHERE " + " AND ".join(conditions)
+        with connect(self.path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM newsletters" + where, params).fetchone()[0]
+
+    def list(self, page=0, page_size=config.ARCHIVE_PAGE_SIZE, topic=None, date_from=None, date_to=None):
+        # Newest first, without touching the article bodies
+        conditions, params = self._filters(topic, date_from, date_to)
+        query = f"SELECT {SUMMARY_COLUMNS} FROM newsletters WHERE " + " AND ".join(conditions)
+        query += " ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?"
+        params += [page_size, page * page_size]
+
+        with connect(self.path) as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [
+            {
+                "id": row[0],
+                "date": row[1],
+                "timestamp": row[2],
+                "ai_topics": decode_topics(row[3], self.strings),
+                "pm_topics": decode_topics(row[4], self.strings),
+                "ai_count": row[5],
+                "pm_count": row[6],
+            }
+            for row in rows
+        ]
+
+    def get(self, newsletter_id):
+        with connect(self.path) as conn:
+            row = conn.execute("SELECT body FROM newsletters WHERE id = ?", (newsletter_id,)).fetchone()
+        if row is None:
+            return None
+        newsletter = decode_body(row[0], self.strings)
+        newsletter["id"] = newsletter_id
+        return newsletter
+
+    def iter_newsletters(self, batch_size=config.EXPORT_BATCH_SIZE):
+        """Yields every published newsletter, oldest first, reading ``batch_size`` bodies per query."""
+        last_id = 0
+        while True:
+            with connect(self.path) as conn:
+                rows = conn.execute(
+                    "SELECT id, body FROM newsletters WHERE id > ? AND draft = 0 ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for newsletter_id, body in rows:
+                newsletter = decode_body(body, self.strings)
+                newsletter["id"] = newsletter_id
+                yield newsletter
+            last_id = rows[-1][0]
+
+    def search(self, query, page=0, page_size=config.ARCHIVE_PAGE_SIZE, topic=None, date_from=None, date_to=None):
+        """Ranked full-text search over archived insights.
+
+        Returns ``(total, results)``; each result has the newsletter id and
+        date, the insight's section, position and title, and a snippet with
+        the matched words in bold. ``date_from``/``date_to`` are inclusive
+        ISO dates compared with the issue date.
+        """
+        match = match_query(query)
+        if not match:
+            return 0, []
+
+        conditions, params = self._filters(topic, date_from, date_to)
+        conditions.insert(0, "insight_search MATCH ?")
+        params.insert(0, match)
+        where = (
+            " FROM insight_search JOIN newsletters ON newsletters.id = insight_search.newsletter_id"
+            " WHERE " + " AND ".join(conditions)
+        )
+
+        weights = ", ".join(str(weight) for weight in SEARCH_WEIGHTS)
+        with connect(self.path) as conn:
+            total = conn.execute("SELECT COUNT(*)" + where, params).fetchone()[0]
+            rows = conn.execute(
+                "SELECT insight_search.newsletter_id, newsletters.date, section, position, title,"
+                " snippet(insight_search, -1, '**', '**', ' … ', 24)"
+                + where
+                + f" ORDER BY bm25(insight_search, {weights}), newsletters.timestamp DESC LIMIT ? OFFSET ?",
+                params + [page_size, page * page_size]
+            ).fetchall()
+        return total, [
+            {
+                "newsletter_id": row[0],
+                "date": row[1],
+                "section": row[2],
+                "position": row[3],
+                "title": row[4],
+                "snippet": row[5],
+            }
+            for row in rows
+        ]
+
+    def topics(self):
+        with connect(self.path) as conn:
+            rows = conn.execute("SELECT DISTINCT topic FROM newsletter_topics ORDER BY topic").fetchall()
+        return [row[0] for row in rows]
+
+    def record_stages(self, newsletter_id, stages):
+        """Adds stage timings measured after archiving, such as the app's rendering, to the newsletter's run."""
+        with connect(self.path) as conn:
+            row = conn.execute(
+                "SELECT id, data FROM run_metrics WHERE newsletter_id = ? ORDER BY id DESC LIMIT 1", (newsletter_id,)
+            ).fetchone()
+            if row is None:
+                return
+            data = json.loads(row[1])
+            data["stages"].update(stages)
+            conn.execute("UPDATE run_metrics SET data = ? WHERE id = ?", (json.dumps(data), row[0]))
+
+    def recent_metrics(self, limit=50):
+        with connect(self.path) as conn:
+            rows = conn.execute("SELECT data FROM run_metrics ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def delete(self, newsletter_id):
+        with connect(self.path) as conn:
+            conn.execute("DELETE FROM newsletter_topics WHERE newsletter_id = ?", (newsletter_id,))
+            conn.execute("DELETE FROM insight_search WHERE newsletter_id = ?", (newsletter_id,))
+            cursor = conn.execute("DELETE FROM newsletters WHERE id = ?", (newsletter_id,))
+        self.insights.remove(newsletter_id)
+        return cursor.rowcount > 0
@@ -0,0 +1,89 @@
+import time
+from datetime import date
+
+from .generation import MAX_TOKENS, MODEL, build_newsletter
+from .metrics import sum_usage, usage_dict
+from .parsing import parse_insights
+from .prompts import build_requests
+from .routing import route_requests
+
+
+def custom_id(team_index, section):
+    return f"team{team_index}-{section}"
+
+
+def build_batch_requests(teams, models=None):
+    """One batch request per section of every (resolved) team config."""
+    batch_requests = []
+    for i, team in enumerate(teams):
+        # Draft-then-refine needs two dependent calls, so batches always use single calls
+        requests = route_requests(
+            build_requests(team["ai_topics"], team["pm_topics"], team["num_ai"], team["num_pm"], team["team_context"]),
+            {"ai": team["num_ai"], "pm": team["num_pm"]},
+            models,
+        )
+        for section, request in requests.items():
+            batch_requests.append({
+                "custom_id": custom_id(i, section),
+                "params": {"model": MODEL, "max_tokens": MAX_TOKENS, **request},
+            })
+    return batch_requests
+
+
+def submit_batch(client, teams, models=None):
+    batch = client.messages.batches.create(requests=build_batch_requests(teams, models))
+    return batch.id
+
+
+def wait_for_batch(client, batch_id, poll_interval=30, timeout=None, on_poll=None):
+    started = time.monotonic()
+    while True:
+        batch = client.messages.batches.retrieve(batch_id)
+        if on_poll:
+            on_poll(batch)
+        if batch.processing_status == "ended":
+            return batch
+        if timeout is not None and time.monotonic() - started > timeout:
+            raise TimeoutError(f"Batch {batch_id} still {batch.processing_status} after {timeout}s")
+        time.sleep(poll_interval)
+
+
+def collect_batch(client, batch_id, teams):
+    """Maps an ended batch's results back onto newsletters, one per team.
+
+    Returns a list of ``(team, newsletter, errors, usage)`` in team order;
+    ``newsletter`` is None when both of a team's sections failed.
+    """
+    results = [{} for _ in teams]
+    errors = [{} for _ in teams]
+    usages = [[] for _ in teams]
+    for entry in client.messages.batches.results(batch_id):
+        team_part, section = entry.custom_id.split("-", 1)
+        i = int(team_part[len("team"):])
+        if entry.result.type != "succeeded":
+            errors[i][section] = getattr(entry.result, "error", None) or entry.result.type
+            continue
+
+        message = entry.result.message
+        usages[i].append(usage_dict(message.usage))
+        try:
+            articles, invalid = parse_insights(message.content[0].text)
+        except ValueError as e:
+            errors[i][section] = str(e)
+            continue
+        # Batch runs are unattended, so invalid items are dropped rather than re-requested
+        if articles:
+            results[i][section] = articles[:teams[i][f"num_{section}"]]
+        if invalid:
+            errors[i][section] = f"{len(invalid)} invalid insight(s) dropped"
+
+    collected = []
+    for i, team in enumerate(teams):
+        newsletter = None
+        if results[i]:
+            newsletter = build_newsletter(
+                date.fromisoformat(team["date"]), results[i], team["ai_topics"], team["pm_topics"], team["team_context"]
+            )
+            newsletter["team"] = team["name"]
+        collected.append((team, newsletter, {k: str(v) for k, v in errors[i].items()}, sum_usage(usages[i])))
+    return collected
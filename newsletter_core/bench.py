@@ -0,0 +1,366 @@
+"""Offline performance benchmarks against the local fake API.
+
+Each scenario exercises one path at scale and reports throughput, latency
+percentiles and memory, so regressions show up in CI without an API key or
+network::
+
+    python -m newsletter_core bench --save baseline.json
+    python -m newsletter_core bench --compare baseline.json
+"""
+import importlib.util
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from .archive import NewsletterArchive
+from .client import LimitedClient, RateLimiter
+from .export import EXPORTERS, export_newsletter
+from .fake_api import FakeAnthropicServer, canned_response_text
+from .generation import build_newsletter, generate_newsletter
+from .metrics import percentile
+from .parsing import InsightStreamParser
+from .rendering import render_newsletter
+
+SCENARIOS = ("generation", "parsing", "rendering", "archive", "startup")
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(PACKAGE_ROOT, "newsletter_generator.py")
+
+# Run in fresh interpreters, so module caches from earlier scenarios don't hide import costs
+IMPORT_PROBE = """
+import time
+started = time.perf_counter()
+import newsletter_core
+print(time.perf_counter() - started)
+"""
+
+APP_PROBE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=60)
+runs = []
+for _ in range(int(sys.argv[2]) + 1):
+    started = time.perf_counter()
+    app.run()
+    runs.append(time.perf_counter() - started)
+print(json.dumps(runs))
+"""
+
+AI_TOPICS = ["Generative AI / LLMs", "AI Cost Optimization"]
+PM_TOPICS = ["Product Strategy", "Customer Research"]
+
+# Vocabulary for synthetic insights, so search and dedup see varied text
+WORDS = (
+    "agent latency pricing roadmap retention onboarding model evaluation churn pipeline vector search"
+    " multimodal voice checkout discovery interview metric experiment launch stakeholder budget hiring"
+    " inference caching privacy compliance fraud recommendation localisation support analytics growth"
+).split()
+
+# p95 latencies below this are too noisy to compare between runs
+MIN_COMPARED_MS = 1.0
+
+
+def _sentence(rng, length):
+    return " ".join(rng.choice(WORDS) for _ in range(length)).capitalize() + "."
+
+
+def sample_insight(rng):
+    return {
+        "title": _sentence(rng, 6)[:-1],
+        "key_insight": " ".join(_sentence(rng, 14) for _ in range(3)),
+        "why_it_matters": _sentence(rng, 16),
+        "action_items": [_sentence(rng, 8) for _ in range(3)],
+        "search_terms": [" ".join(rng.sample(WORDS, 2)) for _ in range(2)],
+        "recommended_sources": ["Local Fixtures"],
+    }
+
+
+def sample_newsletter(rng, day=0, insights=3):
+    """A synthetic newsletter shaped like ``build_newsletter`` output, without any API calls."""
+    results = {section: [sample_insight(rng) for _ in range(insights)] for section in ("ai", "pm")}
+    issue = date.fromordinal(date(2025, 1, 1).toordinal() + day)
+    return build_newsletter(issue, results, AI_TOPICS, PM_TOPICS)
+
+
+@contextmanager
+def _traced(trace_memory):
+    # Traced peak covers every thread, including the in-process fake API
+    peak = {"bytes": None}
+    if trace_memory:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+    try:
+        yield peak
+    finally:
+        if trace_memory:
+            peak["bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+
+def _max_rss_mb():
+    # Process high-water mark; Linux reports kilobytes, macOS bytes
+    if resource is None:
+        return None
+    scale = 1 if os.uname().sysname == "Darwin" else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20, 1)
+
+
+def _result(name, latencies, seconds, peak, **extra):
+    latencies = [latency * 1000 for latency in latencies]
+    return {
+        "name": name,
+        "ops": len(latencies),
+        "seconds": round(seconds, 3),
+        "throughput": round(len(latencies) / seconds, 1) if seconds else None,
+        "p50_ms": round(percentile(latencies, 50), 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95), 2) if latencies else None,
+        "max_ms": round(max(latencies), 2) if latencies else None,
+        "peak_mb": round(peak["bytes"] / 2 ** 20, 1) if peak["bytes"] is not None else None,
+        "rss_mb": _max_rss_mb(),
+        **extra,
+    }
+
+
+def _timed(op, inputs):
+    """Runs ``op`` on each input in turn; returns the latencies and total seconds."""
+    latencies = []
+    started = time.perf_counter()
+    for item in inputs:
+        op_started = time.perf_counter()
+        op(item)
+        latencies.append(time.perf_counter() - op_started)
+    return latencies, time.perf_counter() - started
+
+
+def bench_generation(newsletters, sessions, stream=False, backend=None, trace_memory=False):
+    """``newsletters`` full generations spread over ``sessions`` concurrent sessions.
+
+    The client has its own unthrottled limiter, so only the fake API's
+    latency and injected failures slow it down; 429s are retried as usual.
+    """
+    import anthropic
+
+    server = FakeAnthropicServer(**(backend or {})).start()
+    limiter = RateLimiter(10 ** 9, 10 ** 9, max_concurrency=2 * sessions)
+    client = LimitedClient(anthropic.Anthropic(api_key="bench", base_url=server.base_url, max_retries=0), limiter)
+    failed_sections = 0
+
+    def run(_):
+        nonlocal failed_sections
+        started = time.perf_counter()
+        newsletter, errors, _ = generate_newsletter(
+            client, date.today(), AI_TOPICS, PM_TOPICS, 3, 3, stream=stream
+        )
+        failed_sections += len(errors)
+        return time.perf_counter() - started
+
+    try:
+        with _traced(trace_memory) as peak:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=sessions) as executor:
+                latencies = list(executor.map(run, range(newsletters)))
+            seconds = time.perf_counter() - started
+    finally:
+        server.stop()
+
+    return [_result(
+        "generation",
+        latencies,
+        seconds,
+        peak,
+        sessions=sessions,
+        requests=server.request_count,
+        rate_limited=server.rate_limited_count,
+        malformed=server.malformed_count,
+        retries=limiter.stats()["retries"],
+        failed_sections=failed_sections,
+    )]
+
+
+def bench_parsing(iterations, texts=None, chunk_size=64, trace_memory=False):
+    """Parses responses as they arrive when streaming, ``chunk_size`` characters at a time."""
+    texts = texts or [canned_response_text({"messages": [{"role": "user", "content": "Generate 8 insights"}]})]
+
+    def parse(text):
+        parser = InsightStreamParser()
+        for start in range(0, len(text), chunk_size):
+            parser.feed(text[start:start + chunk_size])
+        parser.finish()
+
+    with _traced(trace_memory) as peak:
+        latencies, seconds = _timed(parse, (texts[i % len(texts)] for i in range(iterations)))
+    return [_result("parsing", latencies, seconds, peak)]
+
+
+def bench_rendering(count, seed=1, trace_memory=False):
+    """Renders ``count`` distinct newsletters and exports each in every format, so nothing hits the memo."""
+    rng = random.Random(seed)
+    samples = [sample_newsletter(rng, day) for day in range(count)]
+
+    def render(newsletter):
+        render_newsletter(newsletter)
+        for name in EXPORTERS:
+            export_newsletter(newsletter, name)
+
+    with _traced(trace_memory) as peak:
+        latencies, seconds = _timed(render, samples)
+    return [_result("rendering", latencies, seconds, peak)]
+
+
+def bench_archive(size, queries=50, seed=1, trace_memory=False):
+    """Fills a fresh archive with ``size`` newsletters, then times listing, search, loads and dedup lookups."""
+    rng = random.Random(seed)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        archive = NewsletterArchive(os.path.join(directory, "archive.db"))
+        samples = [sample_newsletter(rng, day) for day in range(size)]
+        pages = max(1, size // 10)
+
+        def dedup(article):
+            archive.insights.find_duplicates(article)
+
+        cases = [
+            ("archive.add", archive.add, samples),
+            ("archive.list", lambda page: archive.list(page=page), [rng.randrange(pages) for _ in range(queries)]),
+            ("archive.search", archive.search, [" ".join(rng.sample(WORDS, 2)) for _ in range(queries)]),
+            ("archive.get", archive.get, [rng.randint(1, size) for _ in range(queries)]),
+            # The first lookup loads every signature; timed on its own so the lookups below stay comparable
+            ("archive.dedup_load", lambda _: archive.insights.refresh(), [None]),
+            ("archive.dedup", dedup, [sample_insight(rng) for _ in range(queries)]),
+        ]
+        for name, op, inputs in cases:
+            with _traced(trace_memory) as peak:
+                latencies, seconds = _timed(op, inputs)
+            results.append(_result(name, latencies, seconds, peak))
+
+        with _traced(trace_memory) as peak:
+            latencies = []
+            started = op_started = time.perf_counter()
+            for _ in archive.iter_newsletters():
+                latencies.append(time.perf_counter() - op_started)
+                op_started = time.perf_counter()
+            seconds = time.perf_counter() - started
+        results.append(_result("archive.iter", latencies, seconds, peak))
+    return results
+
+
+def _probe(code, *args, directory):
+    env = {**os.environ, "PYTHONPATH": PACKAGE_ROOT, "NEWSLETTER_DATA_DIR": directory, "ANTHROPIC_API_KEY": "bench"}
+    output = subprocess.run(
+        [sys.executable, "-c", code, *map(str, args)], env=env, cwd=directory,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def bench_startup(runs=5, reruns=20):
+    """Cold import of the package and, when Streamlit is installed, the app's first run and reruns.
+
+    Every cold measurement uses a new interpreter and an empty data directory.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        latencies = [_probe(IMPORT_PROBE, directory=directory) for _ in range(runs)]
+        # Memory is measured in the probes' own processes, so neither column applies here
+        results.append(_result("startup.import", latencies, time.perf_counter() - started, {"bytes": None}, rss_mb=None))
+
+        if importlib.util.find_spec("streamlit") is None or not os.path.exists(APP_PATH):
+            return results
+        cold, rerun_latencies = [], []
+        started = time.perf_counter()
+        for i in range(runs):
+            app_runs = _probe(APP_PROBE, APP_PATH, reruns if i == 0 else 0, directory=tempfile.mkdtemp(dir=directory))
+            cold.append(app_runs[0])
+            rerun_latencies += app_runs[1:]
+        results.append(_result("startup.app", cold, time.perf_counter() - started, {"bytes": None}, rss_mb=None))
+        results.append(_result("app.rerun", rerun_latencies, sum(rerun_latencies), {"bytes": None}, rss_mb=None))
+    return results
+
+
+def run_benchmarks(scenarios=SCENARIOS, newsletters=40, sessions=8, archive_size=500, parse_iterations=2000,
+                   stream=False, backend=None, recordings=None, trace_memory=False):
+    """Runs the chosen scenarios and returns the report: one result per measured operation.
+
+    ``backend`` holds ``FakeAnthropicServer`` options for the generation
+    scenario, and ``recordings`` (response texts) are also what the parsing
+    scenario parses. Every result carries the process's peak RSS so far;
+    ``trace_memory`` adds each operation's peak traced allocation, at the
+    cost of several times slower timings, so only compare reports made with
+    the same setting.
+    """
+    results = []
+    for scenario in scenarios:
+        if scenario == "generation":
+            results += bench_generation(newsletters, sessions, stream, backend, trace_memory)
+        elif scenario == "parsing":
+            results += bench_parsing(parse_iterations, recordings, trace_memory=trace_memory)
+        elif scenario == "rendering":
+            results += bench_rendering(newsletters * 5, trace_memory=trace_memory)
+        elif scenario == "archive":
+            results += bench_archive(archive_size, trace_memory=trace_memory)
+        elif scenario == "startup":
+            results += bench_startup()
+        else:
+            raise ValueError(f"Unknown benchmark scenario: {scenario}")
+
+    return {"results": results, "trace_memory": trace_memory}
+
+
+def format_report(report):
+    columns = ("name", "ops", "throughput", "p50_ms", "p95_ms", "max_ms", "peak_mb", "rss_mb")
+    rows = [columns] + [
+        tuple("-" if result[column] is None else str(result[column]) for column in columns)
+        for result in report["results"]
+    ]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    lines = ["  ".join(cell.ljust(width) for cell, width in zip(row, widths)) for row in rows]
+    for result in report["results"]:
+        extra = {k: v for k, v in result.items() if k not in columns and k != "seconds"}
+        if extra:
+            lines.append(f"{result['name']}: " + ", ".join(f"{k} {v}" for k, v in extra.items()))
+    return "\n".join(lines)
+
+
+def compare_reports(report, baseline, tolerance=0.25):
+    """Regressions of ``report`` against ``baseline``, as messages.
+
+    An operation regresses when its throughput drops, or its p95 latency or
+    traced peak memory grows, by more than ``tolerance`` (a fraction).
+    """
+    previous = {result["name"]: result for result in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        before = previous.get(result["name"])
+        if before is None:
+            continue
+        if before["throughput"] and result["throughput"] is not None \
+                and result["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{result['name']}: throughput {result['throughput']}/s, was {before['throughput']}/s"
+            )
+        if before["p95_ms"] is not None and result["p95_ms"] is not None and before["p95_ms"] >= MIN_COMPARED_MS \
+                and result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{result['name']}: p95 {result['p95_ms']} ms, was {before['p95_ms']} ms")
+        if before.get("peak_mb") and result["peak_mb"] is not None \
+                and result["peak_mb"] > before["peak_mb"] * (1 + tolerance):
+            regressions.append(f"{result['name']}: peak {result['peak_mb']} MB, was {before['peak_mb']} MB")
+    return regressions
+
+
+def load_report(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import time
+
+from . import config
+from .db import connect, ensure_parent_dir
+
+
+class ResponseCache:
+    """Persistent cache of parsed section responses, keyed by prompt content.
+
+    Entries expire after ``ttl_seconds`` and the store is trimmed to the
+    ``max_entries`` most recently used keys. Hit/miss counters are kept in
+    the database so they are shared by every session of a deployment.
+    """
+
+    def __init__(self, path=config.CACHE_PATH, ttl_seconds=config.CACHE_TTL_SECONDS,
+                 max_entries=config.CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        ensure_parent_dir(path)
+        with connect(self.path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    @staticmethod
+    def key(request, model, max_tokens):
+        payload = json.dumps([request, model, max_tokens], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _count(self, conn, name):
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1)"
+            " ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,)
+        )
+
+    def get(self, key):
+        now = time.time()
+        with connect(self.path) as conn:
+            row = conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._count(conn, "misses")
+                return None
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._count(conn, "hits")
+            return json.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        with connect(self.path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now)
+            )
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+            # Least recently used entries beyond the size bound are evicted
+            conn.execute(
+                "DELETE FROM responses WHERE key NOT IN"
+                " (SELECT key FROM responses ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+
+    def stats(self):
+        with connect(self.path) as conn:
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+            entries = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "entries": entries,
+        }
+
+    def clear(self):
+        with connect(self.path) as conn:
+            conn.execute("DELETE FROM responses")
+            conn.execute("DELETE FROM counters")
+
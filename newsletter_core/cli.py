@@ -0,0 +1,386 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+
+from .archive import NewsletterArchive
+from .bench import SCENARIOS, compare_reports, format_report, load_report, run_benchmarks
+from .batch import collect_batch, submit_batch, wait_for_batch
+from .cache import ResponseCache
+from .client import get_client
+from .config import ISSUE_INTERVAL_DAYS
+from .email_format import newsletter_slug
+from .export import ARCHIVE_EXPORT_KINDS, EXPORTERS, export_archive
+from .fake_api import add_backend_arguments, backend_options, load_recordings
+from .generation import generate_newsletter
+from .jobs import ACTIVE_STATES
+from .metrics import format_usage, sum_usage
+from .prompts import build_requests
+from .rendering import render_newsletter
+from .routing import prefix_cacheable, route_requests
+from .schedule import get_scheduler, next_issue_date
+from .teams import load_teams, resolve_team, team_slug
+
+
+def make_client(base_url=None):
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    return get_client(os.environ.get("ANTHROPIC_API_KEY"), base_url)
+
+
+def teams_from_args(args):
+    if args.config:
+        teams = load_teams(args.config)
+    else:
+        teams = [{
+            "name": args.name,
+            "team_context": args.team_context,
+            "num_ai": args.num_ai,
+            "num_pm": args.num_pm,
+        }]
+    issue_date = date.fromisoformat(args.date) if args.date else None
+    return [resolve_team(team, issue_date) for team in teams]
+
+
+def write_outputs(newsletter, team, out_dir, archive=None):
+    if archive is not None:
+        archive.add(newsletter)
+
+    stem = os.path.join(out_dir, f"{team_slug(team['name'])}_{newsletter_slug(newsletter)}")
+    formatted = render_newsletter(newsletter)
+    with open(stem + ".json", "w", encoding="utf-8") as f:
+        f.write(formatted["json"])
+    with open(stem + ".txt", "w", encoding="utf-8") as f:
+        f.write(formatted["email"])
+    return stem
+
+
+def report_team(name, stem, errors, usage):
+    for key, error in errors.items():
+        print(f"[{name}] {key} section failed: {error}", file=sys.stderr)
+    if stem is None:
+        print(f"[{name}] ❌ no newsletter generated", file=sys.stderr)
+    else:
+        print(f"[{name}] ✅ {stem}.json / {stem}.txt ({format_usage(usage)})")
+
+
+def models_from_args(args):
+    return {key: model for key, model in (("ai", args.ai_model), ("pm", args.pm_model)) if model}
+
+
+def warmable(team, models):
+    # Running one team first only pays off if some section's system prefix can be cached at all
+    requests = route_requests(
+        build_requests(team["ai_topics"], team["pm_topics"], team["num_ai"], team["num_pm"], team["team_context"]),
+        {"ai": team["num_ai"], "pm": team["num_pm"]},
+        models,
+    )
+    return any(prefix_cacheable(request) for request in requests.values())
+
+
+def run_team(client, team, out_dir, cache=None, archive=None, force_refresh=False, dedup=None,
+             models=None, draft_refine=False):
+    newsletter, errors, usage = generate_newsletter(
+        client,
+        date.fromisoformat(team["date"]),
+        team["ai_topics"],
+        team["pm_topics"],
+        team["num_ai"],
+        team["num_pm"],
+        team["team_context"],
+        cache=cache,
+        force_refresh=force_refresh,
+        dedup=dedup,
+        models=models,
+        draft_refine=draft_refine,
+    )
+    if newsletter is None:
+        return None, errors, usage
+
+    newsletter["team"] = team["name"]
+    return write_outputs(newsletter, team, out_dir, archive), errors, usage
+
+
+def cmd_generate(args):
+    teams = teams_from_args(args)
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    client = make_client(args.base_url)
+    cache = None if args.no_cache else ResponseCache()
+    archive = NewsletterArchive() if args.archive else None
+    # Repeats are checked against the app's archive even when this run does not add to it
+    dedup = None if args.no_dedup else (archive or NewsletterArchive()).insights
+
+    failed = 0
+    usages = []
+
+    def report(name, future):
+        nonlocal failed
+        try:
+            stem, errors, usage = future.result()
+        except Exception as e:
+            stem, errors, usage = None, {"newsletter": str(e)}, None
+
+        if usage is not None:
+            usages.append(usage)
+        if stem is None:
+            failed += 1
+        report_team(name, stem, errors, usage)
+
+    def submit(executor, team):
+        return executor.submit(
+            run_team, client, team, args.out_dir, cache, archive, args.force_refresh, dedup,
+            models_from_args(args), args.draft_refine
+        )
+
+    # Each team runs its two sections concurrently, so up to 2 * concurrency requests are in flight
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        rest = teams
+        if len(teams) > 1 and not args.no_warm and warmable(teams[0], models_from_args(args)):
+            # The prompt cache is only readable once a first request has written it,
+            # so one team goes alone before the rest fan out on the shared prefix
+            report(teams[0]["name"], submit(executor, teams[0]))
+            rest = teams[1:]
+
+        futures = {submit(executor, team): team for team in rest}
+        for future in as_completed(futures):
+            report(futures[future]["name"], future)
+
+    if len(teams) > 1:
+        print(f"Total for {len(teams)} teams: {format_usage(sum_usage(usages))}")
+    return 1 if failed else 0
+
+
+def cmd_batch(args):
+    client = make_client(args.base_url)
+
+    if args.resume:
+        with open(args.resume, encoding="utf-8") as f:
+            manifest = json.load(f)
+        print(f"Resuming batch {manifest['batch_id']}")
+    else:
+        teams = teams_from_args(args)
+        os.makedirs(args.out_dir, exist_ok=True)
+        manifest = {"batch_id": submit_batch(client, teams, models_from_args(args)), "out_dir": args.out_dir, "teams": teams}
+        # The manifest is all that is needed to collect the results later with --resume
+        manifest_path = os.path.join(args.out_dir, f"batch_{manifest['batch_id']}.json")
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        print(f"Submitted batch {manifest['batch_id']} for {len(teams)} teams ({manifest_path})")
+        if args.no_wait:
+            return 0
+
+    wait_for_batch(
+        client,
+        manifest["batch_id"],
+        poll_interval=args.poll_interval,
+        timeout=args.timeout,
+        on_poll=lambda batch: print(f"Batch {batch.id}: {batch.processing_status}"),
+    )
+
+    archive = NewsletterArchive() if args.archive else None
+    failed = 0
+    usages = []
+    for team, newsletter, errors, usage in collect_batch(client, manifest["batch_id"], manifest["teams"]):
+        stem = None
+        if newsletter is None:
+            failed += 1
+        else:
+            stem = write_outputs(newsletter, team, manifest["out_dir"], archive)
+        usages.append(usage)
+        report_team(team["name"], stem, errors, usage)
+
+    print(f"Total for {len(manifest['teams'])} teams: {format_usage(sum_usage(usages))}")
+    return 1 if failed else 0
+
+
+def cmd_export(args):
+    kind = args.kind or ("ndjson" if args.out.endswith(".ndjson") else "zip")
+    written = export_archive(NewsletterArchive(), args.out, kind, formats=args.formats)
+    print(f"Exported {written} newsletters to {args.out}")
+    return 0
+
+
+def cmd_bench(args):
+    report = run_benchmarks(
+        args.scenarios,
+        newsletters=args.newsletters,
+        sessions=args.sessions,
+        archive_size=args.archive_size,
+        parse_iterations=args.parse_iterations,
+        stream=args.stream,
+        backend=backend_options(args),
+        recordings=load_recordings(args.recordings) if args.recordings else None,
+        trace_memory=args.trace_memory,
+    )
+    print(format_report(report))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved report to {args.save}")
+    if args.compare:
+        baseline = load_report(args.compare)
+        if baseline.get("trace_memory") != report["trace_memory"]:
+            print(f"{args.compare} was made with a different --trace-memory setting; timings are not comparable",
+                  file=sys.stderr)
+            return 2
+        regressions = compare_reports(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No regressions against {args.compare}")
+    return 0
+
+
+def wait_for_drafts(scheduler, job_ids):
+    # Prints each draft job's outcome once it ends; returns how many failed
+    failed = 0
+    for job_id in job_ids:
+        while (job := scheduler.jobs.get(job_id))["status"] in ACTIVE_STATES:
+            time.sleep(1)
+        name = job["params"]["draft_config"]
+        if job["status"] == "done":
+            print(f"[{name}] ✅ draft {job['newsletter_id']} for {job['params']['date']}")
+        else:
+            failed += 1
+            print(f"[{name}] ❌ {job['error']}", file=sys.stderr)
+    return failed
+
+
+def cmd_schedule(args):
+    scheduler = get_scheduler()
+    if args.action == "save":
+        if not args.config:
+            print("schedule save needs --config", file=sys.stderr)
+            return 2
+        for team in load_teams(args.config):
+            saved = scheduler.save({
+                **team,
+                "first_date": args.first_date or team.get("date"),
+                "interval_days": args.interval_days,
+            })
+            print(f"Saved {saved['name']}: next issue {next_issue_date(saved)}")
+    elif args.action == "list":
+        for saved in scheduler.configs():
+            next_issue = next_issue_date(saved)
+            if scheduler.archive.has_issue(saved["name"], next_issue.isoformat()):
+                status = "drafted"
+            elif scheduler.gave_up(saved["name"], next_issue):
+                status = "failed; save the configuration again to retry"
+            else:
+                status = "pending"
+            print(f"{saved['name']}: next issue {next_issue} every {saved['interval_days']} days ({status})")
+    elif args.action == "refresh":
+        if not args.name:
+            print("schedule refresh needs --name", file=sys.stderr)
+            return 2
+        issue = date.fromisoformat(args.issue_date) if args.issue_date else None
+        try:
+            job_id = scheduler.refresh(make_client(args.base_url), args.name, issue)
+        except ValueError as e:
+            print(str(e), file=sys.stderr)
+            return 2
+        return 1 if wait_for_drafts(scheduler, [job_id]) else 0
+    else:
+        # Meant for cron during off-peak hours, so it ignores the off-peak window
+        job_ids = scheduler.run_due(make_client(args.base_url))
+        print(f"Drafting {len(job_ids)} issues")
+        return 1 if wait_for_drafts(scheduler, job_ids) else 0
+    return 0
+
+
+def add_team_arguments(parser):
+    parser.add_argument("--config", help="JSON file with a list of team configs (name, team_context, "
+                                         "ai_topics, pm_topics, num_ai, num_pm, date)")
+    parser.add_argument("--name", default="team", help="Team name when no --config is given")
+    parser.add_argument("--team-context", default="", help="Team context when no --config is given")
+    parser.add_argument("--num-ai", type=int, default=2, help="AI insights when no --config is given")
+    parser.add_argument("--num-pm", type=int, default=2, help="PM insights when no --config is given")
+    parser.add_argument("--date", help="Issue date (YYYY-MM-DD) for teams without their own; defaults to today")
+    parser.add_argument("--out-dir", default="newsletters", help="Directory for the .json and .txt outputs")
+    parser.add_argument("--archive", action="store_true", help="Also save each newsletter to the archive")
+    parser.add_argument("--base-url", help="Anthropic API base URL, e.g. a local fake endpoint")
+    parser.add_argument("--ai-model", help="Model for the AI section (default: NEWSLETTER_AI_MODEL or Sonnet 4)")
+    parser.add_argument("--pm-model", help="Model for the PM section (default: NEWSLETTER_PM_MODEL or Sonnet 4)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m newsletter_core",
+        description="Generate AI & PM insight newsletters without the Streamlit UI."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate = subparsers.add_parser("generate", help="Generate one newsletter per team")
+    add_team_arguments(generate)
+    generate.add_argument("--concurrency", type=int, default=4, help="Newsletters generated at the same time")
+    generate.add_argument("--no-cache", action="store_true", help="Do not read or write the response cache")
+    generate.add_argument("--force-refresh", action="store_true", help="Skip cache lookups but store fresh results")
+    generate.add_argument("--no-warm", action="store_true",
+                          help="Start all teams at once even when the first team could warm the prompt cache")
+    generate.add_argument("--no-dedup", action="store_true",
+                          help="Do not exclude or regenerate insights that repeat archived ones")
+    generate.add_argument("--draft-refine", action="store_true",
+                          help="Draft each section with the fast model, then refine it with the section's model")
+    generate.set_defaults(func=cmd_generate)
+
+    batch = subparsers.add_parser("batch", help="Generate many newsletters through the Message Batches API")
+    add_team_arguments(batch)
+    batch.add_argument("--resume", metavar="MANIFEST", help="Collect a previously submitted batch")
+    batch.add_argument("--no-wait", action="store_true", help="Submit the batch and exit without collecting")
+    batch.add_argument("--poll-interval", type=float, default=30, help="Seconds between status checks")
+    batch.add_argument("--timeout", type=float, help="Give up waiting after this many seconds")
+    batch.set_defaults(func=cmd_batch)
+
+    export = subparsers.add_parser("export", help="Export the whole archive to a zip or NDJSON file")
+    export.add_argument("out", help="Output file, e.g. archive.zip or archive.ndjson")
+    export.add_argument("--kind", choices=ARCHIVE_EXPORT_KINDS, help="Defaults to ndjson for .ndjson files, else zip")
+    export.add_argument("--formats", nargs="+", choices=list(EXPORTERS),
+                        help="Formats written per newsletter in a zip export (default: all)")
+    export.set_defaults(func=cmd_export)
+
+    schedule = subparsers.add_parser("schedule", help="Save configurations and pre-generate their next issues as drafts")
+    schedule.add_argument("action", choices=("save", "list", "run", "refresh"),
+                          help="save --config teams, list them, run: draft every issue due now, "
+                               "or refresh --name: regenerate one configuration's draft")
+    schedule.add_argument("--name", help="Saved configuration to refresh")
+    schedule.add_argument("--issue-date", help="Issue (YYYY-MM-DD) to refresh; defaults to the next one")
+    schedule.add_argument("--config", help="JSON file with the team configs to save")
+    schedule.add_argument("--first-date", help="First issue date (YYYY-MM-DD) for teams without a date; defaults to today")
+    schedule.add_argument("--interval-days", type=int, default=ISSUE_INTERVAL_DAYS, help="Days between issues")
+    schedule.add_argument("--base-url", help="Anthropic API base URL, e.g. a local fake endpoint")
+    schedule.set_defaults(func=cmd_schedule)
+
+    bench = subparsers.add_parser("bench", help="Benchmark generation, parsing, rendering and the archive offline")
+    bench.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    bench.add_argument("--newsletters", type=int, default=40,
+                       help="Newsletters generated (five times as many are rendered)")
+    bench.add_argument("--sessions", type=int, default=8, help="Concurrent generation sessions")
+    bench.add_argument("--archive-size", type=int, default=500, help="Newsletters in the benchmark archive")
+    bench.add_argument("--parse-iterations", type=int, default=2000, help="Responses parsed")
+    bench.add_argument("--stream", action="store_true", help="Stream the generation responses")
+    add_backend_arguments(bench)
+    bench.add_argument("--trace-memory", action="store_true",
+                       help="Also report each operation's peak traced allocation (timings get several times slower)")
+    bench.add_argument("--save", metavar="REPORT", help="Write the report as JSON, e.g. as a baseline")
+    bench.add_argument("--compare", metavar="BASELINE", help="Exit with 1 if a result regressed against this report")
+    bench.add_argument("--tolerance", type=float, default=0.25,
+                       help="Allowed throughput drop or p95 growth before a result counts as a regression")
+    # A little latency and some failures by default, so retries and repairs are part of the numbers
+    bench.set_defaults(func=cmd_bench, first_token_ms=50.0, tokens_per_second=2000.0, rate_limit_rate=0.05,
+                       malformed_rate=0.05, seed=1)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
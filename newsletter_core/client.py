@@ -0,0 +1,218 @@
+import json
+import random
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from . import config
+
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, amount):
+        """Takes ``amount`` tokens if available; otherwise returns the seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            amount = min(amount, self.capacity)
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return 0.0
+            return (amount - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Process-wide limit on concurrent requests, requests/minute and input tokens/minute."""
+
+    def __init__(self, requests_per_minute=config.API_REQUESTS_PER_MINUTE,
+                 input_tokens_per_minute=config.API_INPUT_TOKENS_PER_MINUTE,
+                 max_concurrency=config.API_MAX_CONCURRENCY):
+        self.requests = TokenBucket(requests_per_minute)
+        self.input_tokens = TokenBucket(input_tokens_per_minute)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._stats = {
+            "in_flight": 0,
+            "waiting": 0,
+            "max_waiting": 0,
+            "requests": 0,
+            "retries": 0,
+            "throttled_seconds": 0.0,
+        }
+
+    def _bump(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+            if name == "waiting":
+                self._stats["max_waiting"] = max(self._stats["max_waiting"], self._stats["waiting"])
+
+    @contextmanager
+    def slot(self, input_tokens):
+        self._bump("waiting")
+        acquired = False
+        try:
+            self._slots.acquire()
+            acquired = True
+            for bucket, amount in ((self.requests, 1), (self.input_tokens, input_tokens)):
+                while (wait := bucket.take(amount)) > 0:
+                    self._bump("throttled_seconds", wait)
+                    time.sleep(wait)
+        except BaseException:
+            if acquired:
+                self._slots.release()
+            raise
+        finally:
+            self._bump("waiting", -1)
+
+        self._bump("in_flight")
+        self._bump("requests")
+        try:
+            yield
+        finally:
+            self._bump("in_flight", -1)
+            self._slots.release()
+
+    def record_retry(self):
+        self._bump("retries")
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+def retry_delay(error, attempt):
+    """Seconds to wait before retrying ``error``, or None if it should not be retried."""
+    # Only ever called with an SDK error in hand, so the import is already cached
+    import anthropic
+
+    if isinstance(error, anthropic.APIConnectionError):
+        retry_after = None
+    elif isinstance(error, anthropic.APIStatusError) and (
+        error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    ):
+        headers = error.response.headers
+        retry_after = headers.get("retry-after-ms")
+        if retry_after is not None:
+            retry_after = float(retry_after) / 1000
+        elif headers.get("retry-after") is not None:
+            try:
+                retry_after = float(headers["retry-after"])
+            except ValueError:
+                retry_after = None
+    else:
+        return None
+
+    if retry_after is not None and 0 <= retry_after <= BACKOFF_MAX_SECONDS:
+        return retry_after
+    # Exponential backoff with full jitter so concurrent callers spread out
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def estimate_input_tokens(params):
+    # Roughly four characters per token; only used for rate limiting
+    return len(json.dumps([params.get("system", ""), params.get("messages", [])])) // 4
+
+
+class LimitedMessages:
+    """``client.messages`` with rate limiting and retries around create/stream."""
+
+    def __init__(self, messages, limiter, max_retries):
+        self._messages = messages
+        self._limiter = limiter
+        self._max_retries = max_retries
+
+    def __getattr__(self, name):
+        # batches, count_tokens, ... pass straight through
+        return getattr(self._messages, name)
+
+    def create(self, **params):
+        estimate = estimate_input_tokens(params)
+        attempt = 0
+        while True:
+            with self._limiter.slot(estimate):
+                try:
+                    return self._messages.create(**params)
+                except Exception as e:
+                    delay = retry_delay(e, attempt)
+                    if delay is None or attempt >= self._max_retries:
+                        raise
+            self._limiter.record_retry()
+            time.sleep(delay)
+            attempt += 1
+
+    @contextmanager
+    def stream(self, **params):
+        # Only opening the stream is retried; once text has been yielded a
+        # retry would duplicate it, so later errors propagate to the caller.
+        estimate = estimate_input_tokens(params)
+        attempt = 0
+        while True:
+            with ExitStack() as stack:
+                stack.enter_context(self._limiter.slot(estimate))
+                try:
+                    stream = stack.enter_context(self._messages.stream(**params))
+                except Exception as e:
+                    delay = retry_delay(e, attempt)
+                    if delay is None or attempt >= self._max_retries:
+                        raise
+                else:
+                    yield stream
+                    return
+            self._limiter.record_retry()
+            time.sleep(delay)
+            attempt += 1
+
+
+class LimitedClient:
+    def __init__(self, client, limiter, max_retries=config.API_MAX_RETRIES):
+        self._client = client
+        self.limiter = limiter
+        self.messages = LimitedMessages(client.messages, limiter, max_retries)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+_limiter = None
+
+
+def get_limiter():
+    global _limiter
+    with _clients_lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+        return _limiter
+
+
+def get_client(api_key=None, base_url=None):
+    """Returns the process-wide client for these credentials.
+
+    Reusing one SDK client keeps its HTTP connection pool warm across
+    sessions, and every client shares one rate limiter, so concurrent
+    sessions and batch workers queue instead of tripping 429s. The SDK's own
+    retries are disabled in favour of ours.
+    """
+    # The SDK takes over a second to import, so it is only imported once a client
+    # is needed; sessions that just browse the archive never pay for it
+    import anthropic
+
+    limiter = get_limiter()
+    with _clients_lock:
+        key = (api_key, base_url)
+        if key not in _clients:
+            client = anthropic.Anthropic(api_key=api_key, base_url=base_url, max_retries=0)
+            _clients[key] = LimitedClient(client, limiter)
+        return _clients[key]
@@ -0,0 +1,50 @@
+import os
+
+# Everything the app persists (response cache, archive, ...) lives under one directory
+DATA_DIR = os.environ.get("NEWSLETTER_DATA_DIR", ".newsletter_data")
+
+CACHE_PATH = os.path.join(DATA_DIR, "response_cache.db")
+CACHE_TTL_SECONDS = int(os.environ.get("NEWSLETTER_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+CACHE_MAX_ENTRIES = int(os.environ.get("NEWSLETTER_CACHE_MAX_ENTRIES", 500))
+
+ARCHIVE_PATH = os.path.join(DATA_DIR, "archive.db")
+ARCHIVE_PAGE_SIZE = 10
+
+# Near-duplicate insights: MinHash similarity cut-off and how many recent titles the prompts exclude
+DEDUP_THRESHOLD = float(os.environ.get("NEWSLETTER_DEDUP_THRESHOLD", 0.5))
+DEDUP_RECENT_TITLES = int(os.environ.get("NEWSLETTER_DEDUP_RECENT_TITLES", 20))
+
+EXPORT_DIR = os.path.join(DATA_DIR, "exports")
+EXPORT_BATCH_SIZE = 50
+
+# Model routing: each section's model, the fast model for draft-then-refine, and the max_tokens ceiling
+DEFAULT_MODEL = "claude-sonnet-4-20250514"
+SECTION_MODELS = {
+    "ai": os.environ.get("NEWSLETTER_AI_MODEL", DEFAULT_MODEL),
+    "pm": os.environ.get("NEWSLETTER_PM_MODEL", DEFAULT_MODEL),
+}
+DRAFT_MODEL = os.environ.get("NEWSLETTER_DRAFT_MODEL", "claude-3-5-haiku-20241022")
+MAX_TOKENS_CEILING = 4000
+
+JOBS_PATH = os.path.join(DATA_DIR, "jobs.db")
+JOB_WORKERS = int(os.environ.get("NEWSLETTER_JOB_WORKERS", 4))
+JOB_POLL_SECONDS = 1.0
+# Each process marks its unfinished jobs as alive this often; jobs silent for JOB_STALE_SECONDS are given up on
+JOB_HEARTBEAT_SECONDS = 15
+JOB_STALE_SECONDS = 120
+
+# Scheduled pre-generation: the next issue of each saved configuration is drafted this many
+# days ahead, only during the off-peak hours ("start-end" in local time, end exclusive)
+SCHEDULE_PATH = os.path.join(DATA_DIR, "schedule.db")
+ISSUE_INTERVAL_DAYS = 14
+SCHEDULE_DAYS_AHEAD = int(os.environ.get("NEWSLETTER_SCHEDULE_DAYS_AHEAD", 3))
+SCHEDULE_OFF_PEAK_HOURS = os.environ.get("NEWSLETTER_OFF_PEAK_HOURS", "1-5")
+SCHEDULE_POLL_SECONDS = 600
+# An issue whose draft failed is retried after 1, 2, 4, ... poll intervals, and given up on after this many attempts
+SCHEDULE_MAX_ATTEMPTS = 4
+
+# Shared API client: size these to the organisation's rate limits
+API_REQUESTS_PER_MINUTE = int(os.environ.get("NEWSLETTER_API_RPM", 50))
+API_INPUT_TOKENS_PER_MINUTE = int(os.environ.get("NEWSLETTER_API_ITPM", 30000))
+API_MAX_CONCURRENCY = int(os.environ.get("NEWSLETTER_API_MAX_CONCURRENCY", 8))
+API_MAX_RETRIES = int(os.environ.get("NEWSLETTER_API_MAX_RETRIES", 5))
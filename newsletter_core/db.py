@@ -0,0 +1,22 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+
+
+def ensure_parent_dir(path):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+
+@contextmanager
+def connect(path):
+    # One short-lived connection per operation keeps the stores safe to use from worker threads
+    conn = sqlite3.connect(path, timeout=10)
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
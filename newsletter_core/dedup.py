@@ -0,0 +1,225 @@
+import hashlib
+import random
+import re
+import threading
+from array import array
+from functools import lru_cache
+
+from . import config
+from .db import connect, ensure_parent_dir
+from .storage import pack_signature, unpack_signature
+
+# 16 bands of 4 rows put the LSH candidate threshold near a Jaccard similarity of 0.5
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in into is it its of on or that the their this to"
+    " was what when which while who why will with your you can more most not than them they these".split()
+)
+
+
+def shingles(text):
+    # Words plus word pairs, so rephrasings that keep the key terms still overlap
+    words = [word for word in re.findall(r"[a-z0-9]+", text.lower()) if word not in STOPWORDS]
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+@lru_cache(maxsize=1)
+def _numpy_permutations():
+    # numpy is imported on first use only, so importing the package stays fast
+    import numpy as np
+
+    a = np.array([a for a, _ in _PERMUTATIONS], dtype=np.uint64)[:, None]
+    b = np.array([b for _, b in _PERMUTATIONS], dtype=np.uint64)[:, None]
+    return np, a >> np.uint64(31), a & np.uint64((1 << 31) - 1), b
+
+
+def _minhash(hashes):
+    try:
+        np, a_hi, a_lo, b = _numpy_permutations()
+    except ImportError:
+        return array("Q", [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS])
+
+    # (a * h + b) % _PRIME for every permutation and hash at once. The products need up to 122 bits,
+    # so a and h are split into 31-bit halves and the partial products folded using 2 ** 61 == 1 (mod _PRIME)
+    prime = np.uint64(_PRIME)
+    h = np.array([value % _PRIME for value in hashes], dtype=np.uint64)
+    h_hi, h_lo = h >> np.uint64(31), h & np.uint64((1 << 31) - 1)
+    mid = a_hi * h_lo + a_lo * h_hi
+    x = ((a_hi * h_hi) << np.uint64(1)) + (mid >> np.uint64(30)) + ((mid & np.uint64((1 << 30) - 1)) << np.uint64(31))
+    x += a_lo * h_lo + b
+    for _ in range(2):
+        x = (x & prime) + (x >> np.uint64(61))
+    x = np.where(x >= prime, x - prime, x)
+    sig = array("Q")
+    sig.frombytes(x.min(axis=1).tobytes())
+    return sig
+
+
+# Generation checks each new insight several times (as it streams, in the replacement round)
+# and then archives it, so signatures are kept for recently seen texts
+@lru_cache(maxsize=1024)
+def signature(text):
+    """MinHash signature of ``text`` as an ``array``, or None if it has no meaningful words.
+
+    The result is shared between calls and must not be modified.
+    """
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for shingle in shingles(text)
+    ]
+    if not hashes:
+        return None
+    return _minhash(hashes)
+
+
+def similarity(sig_a, sig_b):
+    # Share of matching slots estimates the Jaccard similarity of the shingle sets
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / NUM_PERM
+
+
+def band_keys(sig):
+    # Each band's slice of an array signature as bytes: a third of the memory of a tuple of ints
+    return [(band, sig[band * ROWS:(band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+
+
+def insight_text(article):
+    return f"{article.get('title', '')} {article.get('key_insight', '')}"
+
+
+class InsightIndex:
+    """MinHash/LSH index over the titles and key insights of archived newsletters.
+
+    Signatures are stored in the archive database as newsletters are added,
+    and the in-memory LSH buckets are loaded on first use and then only
+    extended with newer rows, so a lookup touches ``BANDS`` dict buckets
+    regardless of archive size.
+    """
+
+    def __init__(self, path=config.ARCHIVE_PATH, threshold=config.DEDUP_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self._entries = {}
+        self._buckets = {}
+        self._last_rowid = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        ensure_parent_dir(path)
+        with connect(self.path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS insight_signatures ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " newsletter_id INTEGER NOT NULL,"
+                " section TEXT NOT NULL,"
+                " title TEXT NOT NULL,"
+                " signature BLOB NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_signatures_newsletter ON insight_signatures (newsletter_id)"
+            )
+
+    def _index(self, rowid, newsletter_id, section, title, sig):
+        self._entries[rowid] = (newsletter_id, section, title, sig)
+        for key in band_keys(sig):
+            self._buckets.setdefault(key, []).append(rowid)
+
+    def refresh(self):
+        """Loads signatures written since the last refresh, e.g. by another session."""
+        with self._refresh_lock:
+            with connect(self.path) as conn:
+                rows = conn.execute(
+                    "SELECT id, newsletter_id, section, title, signature FROM insight_signatures"
+                    " WHERE id > ? ORDER BY id",
+                    (self._last_rowid,)
+                ).fetchall()
+            with self._lock:
+                for rowid, newsletter_id, section, title, sig in rows:
+                    if rowid not in self._entries:
+                        self._index(rowid, newsletter_id, section, title, unpack_signature(sig))
+                if rows:
+                    self._last_rowid = rows[-1][0]
+                self._loaded = True
+
+    def add(self, newsletter):
+        # Unpublished drafts must not turn into exclusions or duplicate matches
+        if newsletter.get("draft"):
+            return
+        rows = []
+        for section in ("ai", "pm"):
+            for article in newsletter.get(f"{section}_articles", []):
+                sig = signature(insight_text(article))
+                if sig is not None:
+                    rows.append((newsletter["id"], section, article.get("title", ""), sig))
+        if not rows:
+            return
+
+        with connect(self.path) as conn:
+            rowids = [
+                conn.execute(
+                    "INSERT INTO insight_signatures (newsletter_id, section, title, signature) VALUES (?, ?, ?, ?)",
+                    (newsletter_id, section, title, pack_signature(sig))
+                ).lastrowid
+                for newsletter_id, section, title, sig in rows
+            ]
+        with self._lock:
+            # Rows of an index that has not been loaded yet are picked up by the first refresh
+            if self._loaded:
+                for rowid, row in zip(rowids, rows):
+                    self._index(rowid, *row)
+
+    def remove(self, newsletter_id):
+        with connect(self.path) as conn:
+            conn.execute("DELETE FROM insight_signatures WHERE newsletter_id = ?", (newsletter_id,))
+        with self._lock:
+            # Bucket lists keep the stale row ids; lookups skip ids missing from _entries
+            for rowid in [rowid for rowid, entry in self._entries.items() if entry[0] == newsletter_id]:
+                del self._entries[rowid]
+
+    def find_duplicates(self, article):
+        """Archived insights similar to ``article``, most similar first, as ``(similarity, newsletter_id, title)``."""
+        if not self._loaded:
+            self.refresh()
+        sig = signature(insight_text(article))
+        if sig is None:
+            return []
+
+        with self._lock:
+            candidates = set()
+            for key in band_keys(sig):
+                candidates.update(self._buckets.get(key, ()))
+            matches = []
+            for rowid in candidates:
+                entry = self._entries.get(rowid)
+                if entry is None:
+                    continue
+                score = similarity(sig, entry[3])
+                if score >= self.threshold:
+                    matches.append((round(score, 2), entry[0], entry[2]))
+        return sorted(matches, reverse=True)
+
+    def recent_titles(self, section, limit=config.DEDUP_RECENT_TITLES):
+        with connect(self.path) as conn:
+            rows = conn.execute(
+                "SELECT title FROM insight_signatures WHERE section = ? ORDER BY id DESC LIMIT ?",
+                (section, limit)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_insight_index(path=config.ARCHIVE_PATH):
+    """Returns the process-wide index for an archive, so its buckets survive app reruns."""
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = InsightIndex(path)
+        return _indexes[path]
@@ -0,0 +1,53 @@
+DIVIDER = "━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
+
+EMAIL_SECTION_TITLES = {
+    "ai": "🤖 AI INSIGHTS",
+    "pm": "📊 PRODUCT MANAGEMENT INSIGHTS",
+}
+
+EMAIL_SIGNATURE = """💡 SHARE YOUR INSIGHTS
+
+Have insights to share? Reply to this email or post in our team channel.
+
+Happy reading!
+
+Best,
+Udit
+Head of Product, North America Languages Experience"""
+
+
+def newsletter_slug(newsletter):
+    return newsletter['date'].replace(' ', '_').replace(',', '')
+
+
+def _email_article(i, article):
+    search_terms = article.get('search_terms', [])
+    sources = article.get('recommended_sources', [])
+    action_items = article.get('action_items', [])
+
+    parts = [f"{i}. {article['title']}\n\n{article['key_insight']}\n\n💡 Why it matters: {article['why_it_matters']}\n\n"]
+    if action_items:
+        parts.append("🎯 Action Items:\n")
+        parts.extend(f"   • {action}\n" for action in action_items)
+        parts.append("\n")
+    parts.append(
+        f"🔍 Learn more: {', '.join(search_terms) if search_terms else 'N/A'}\n"
+        f"📚 Sources: {', '.join(sources) if sources else 'N/A'}\n\n"
+    )
+    return "".join(parts)
+
+
+def format_email(newsletter):
+    # Built as a list of parts and joined once; both sections share one layout
+    parts = [
+        f"Subject: Bi-Weekly Insights: AI & Product Management | {newsletter['date']}\n\n"
+        "Hi team,\n\n"
+        "Here are this week's curated insights on AI trends and product management excellence.\n\n"
+    ]
+    for section in ("ai", "pm"):
+        parts.append(f"{DIVIDER}\n\n{EMAIL_SECTION_TITLES[section]}\n\n")
+        parts.extend(
+            _email_article(i, article) for i, article in enumerate(newsletter[f'{section}_articles'], 1)
+        )
+    parts.append(f"{DIVIDER}\n\n{EMAIL_SIGNATURE}")
+    return "".join(parts)
@@ -0,0 +1,164 @@
+import json
+import os
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from html import escape
+from urllib.parse import quote_plus
+
+from . import config
+from .email_format import EMAIL_SECTION_TITLES, format_email, newsletter_slug
+from .rendering import DEFAULT_SOURCES, content_key, memoized
+
+Exporter = namedtuple("Exporter", "label extension mime render")
+
+EXPORTERS = {}
+
+ARCHIVE_EXPORT_KINDS = ("zip", "ndjson")
+
+
+def register_exporter(name, label, extension, mime, render):
+    """Adds an export format; ``render(newsletter)`` returns the file content as a string."""
+    EXPORTERS[name] = Exporter(label, extension, mime, render)
+
+
+def _search_url(term):
+    return f"https://www.google.com/search?q={quote_plus(term)}"
+
+
+def to_markdown(newsletter):
+    parts = [f"# Bi-Weekly Insights: AI & Product Management\n\n*{newsletter['date']}*\n\n"]
+    for section in ("ai", "pm"):
+        parts.append(f"## {EMAIL_SECTION_TITLES[section]}\n\n")
+        for i, article in enumerate(newsletter.get(f"{section}_articles", []), 1):
+            parts.append(
+                f"### {i}. {article['title']}\n\n{article['key_insight']}\n\n"
+                f"**💡 Why it matters:** {article['why_it_matters']}\n\n"
+            )
+            if article.get('action_items'):
+                parts.append("**🎯 Action Items:**\n\n")
+                parts.extend(f"- {action}\n" for action in article['action_items'])
+                parts.append("\n")
+            if article.get('search_terms'):
+                links = " · ".join(f"[{term}]({_search_url(term)})" for term in article['search_terms'])
+                parts.append(f"**🔍 Learn more:** {links}\n\n")
+            sources = article.get('recommended_sources') or [DEFAULT_SOURCES[section]]
+            parts.append(f"**📚 Sources:** {', '.join(sources)}\n\n")
+    return "".join(parts)
+
+
+def to_html_email(newsletter):
+    # Email clients drop <style> blocks, so every element carries its own inline style
+    parts = [
+        '<!DOCTYPE html><html><body style="margin: 0; padding: 24px; background: #f5f5f5;'
+        ' font-family: Helvetica, Arial, sans-serif; color: #222;">'
+        '<div style="max-width: 680px; margin: 0 auto; background: #ffffff; border-radius: 8px; padding: 24px;">'
+        '<h1 style="margin: 0 0 4px; font-size: 24px; color: #667eea;">Bi-Weekly Insights: AI &amp; Product Management</h1>'
+        f'<p style="margin: 0 0 24px; color: #666;">{escape(newsletter["date"])}</p>'
+    ]
+    for section in ("ai", "pm"):
+        parts.append(
+            '<h2 style="font-size: 18px; border-bottom: 2px solid #667eea; padding-bottom: 6px;">'
+            f"{escape(EMAIL_SECTION_TITLES[section])}</h2>"
+        )
+        for i, article in enumerate(newsletter.get(f"{section}_articles", []), 1):
+            parts.append(
+                '<div style="margin: 0 0 20px; padding: 16px; border-left: 4px solid #667eea; background: #f8f9fa;">'
+                f'<h3 style="margin: 0 0 8px; font-size: 16px;">{i}. {escape(article["title"])}</h3>'
+                f'<p style="margin: 0 0 8px; line-height: 1.6;">{escape(article["key_insight"])}</p>'
+                f'<p style="margin: 0 0 8px; color: #667eea;"><strong>💡 Why it matters:</strong>'
+                f' {escape(article["why_it_matters"])}</p>'
+            )
+            if article.get('action_items'):
+                parts.append('<p style="margin: 0 0 4px;"><strong>🎯 Action Items:</strong></p><ul style="margin: 0 0 8px;">')
+                parts.extend(f"<li>{escape(action)}</li>" for action in article['action_items'])
+                parts.append("</ul>")
+            if article.get('search_terms'):
+                links = " | ".join(
+                    f'<a href="{escape(_search_url(term))}" style="color: #667eea;">{escape(term)}</a>'
+                    for term in article['search_terms']
+                )
+                parts.append(f'<p style="margin: 0 0 4px; font-size: 14px;">🔍 <strong>Learn more:</strong> {links}</p>')
+            sources = article.get('recommended_sources') or [DEFAULT_SOURCES[section]]
+            parts.append(
+                f'<p style="margin: 0; font-size: 14px;">📚 <strong>Sources:</strong> {escape(", ".join(sources))}</p>'
+                "</div>"
+            )
+    parts.append(
+        '<p style="margin: 24px 0 0; color: #666;">Have insights to share? Reply to this email or post in our'
+        " team channel.</p></div></body></html>"
+    )
+    return "".join(parts)
+
+
+register_exporter("html", "HTML email", ".html", "text/html", to_html_email)
+register_exporter("markdown", "Markdown", ".md", "text/markdown", to_markdown)
+register_exporter("text", "Plain text", ".txt", "text/plain", format_email)
+register_exporter("json", "JSON", ".json", "application/json", json.dumps)
+
+
+def export_newsletter(newsletter, name):
+    """Returns ``(content, filename, mime)`` for one newsletter in the ``name`` format.
+
+    The content is memoized like ``render_newsletter``'s, since the app
+    rebuilds its download button on every rerun.
+    """
+    exporter = EXPORTERS[name]
+    content = memoized(f"{content_key(newsletter)}:{name}", lambda: exporter.render(newsletter))
+    return content, f"newsletter_{newsletter_slug(newsletter)}{exporter.extension}", exporter.mime
+
+
+def export_archive(archive, path, kind="zip", formats=None, on_progress=None):
+    """Writes every archived newsletter to ``path`` one at a time and returns how many were written.
+
+    ``kind`` is ``"zip"`` (one file per newsletter and format) or
+    ``"ndjson"`` (one JSON newsletter per line). Only one newsletter is held
+    in memory at a time, and the file appears at ``path`` only once complete.
+    """
+    if kind not in ARCHIVE_EXPORT_KINDS:
+        raise ValueError(f"Unknown archive export kind: {kind}")
+    formats = list(formats or EXPORTERS)
+
+    partial = path + ".part"
+    written = 0
+    if kind == "zip":
+        with zipfile.ZipFile(partial, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+            for newsletter in archive.iter_newsletters():
+                stem = f"{newsletter['id']:05d}_{newsletter_slug(newsletter)}"
+                for name in formats:
+                    # Rendered directly rather than through the memo, which would only churn
+                    bundle.writestr(stem + EXPORTERS[name].extension, EXPORTERS[name].render(newsletter))
+                written += 1
+                if on_progress:
+                    on_progress(written)
+    else:
+        with open(partial, "w", encoding="utf-8") as f:
+            for newsletter in archive.iter_newsletters():
+                f.write(json.dumps(newsletter) + "\n")
+                written += 1
+                if on_progress:
+                    on_progress(written)
+
+    os.replace(partial, path)
+    return written
+
+
+_export_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive-export")
+
+
+def start_archive_export(archive, kind="zip", formats=None, directory=config.EXPORT_DIR):
+    """Runs ``export_archive`` on a background thread.
+
+    Returns ``(future, path, progress)``: the future resolves to the number
+    of newsletters written and ``progress["done"]`` counts them as they go.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"newsletter_archive_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{kind}")
+    progress = {"done": 0, "total": archive.count()}
+
+    def on_progress(done):
+        progress["done"] = done
+
+    future = _export_executor.submit(export_archive, archive, path, kind, formats, on_progress)
+    return future, path, progress
@@ -0,0 +1,351 @@
+"""Local stand-in for the parts of the Anthropic API this package uses.
+
+Serves ``POST /v1/messages`` and the Message Batches endpoints with canned
+insight responses, so the generation and batch paths can be exercised with
+``--base-url`` and no network or API key::
+
+    python -m newsletter_core.fake_api --port 8765
+    python -m newsletter_core batch --config teams.json --base-url http://127.0.0.1:8765
+
+Replies can be slowed to a given time to first token and token rate,
+streamed as server-sent events, replayed from recorded responses, and
+interspersed with 429s or malformed JSON, which is what the offline
+benchmarks (``python -m newsletter_core bench``) use.
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def canned_insights(params):
+    # Honours the "Generate N ..." count in the user message so callers get what they asked for
+    prompt = params["messages"][-1]["content"]
+    if not isinstance(prompt, str):
+        prompt = " ".join(block.get("text", "") for block in prompt)
+    match = re.search(r"Generate (\d+)", prompt)
+    count = int(match.group(1)) if match else 2
+    return [
+        {
+            "title": f"Canned insight {i}",
+            "key_insight": "A placeholder insight served by the local fake API. " * 5,
+            "why_it_matters": "It lets the generation pipeline run without network access.",
+            "action_items": ["Check the rendering", "Check the archive"],
+            "search_terms": ["fake api", "offline testing"],
+            "recommended_sources": ["Local Fixtures"],
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def canned_response_text(params):
+    return "```json\n" + json.dumps(canned_insights(params), indent=2) + "\n```"
+
+
+def replay_responder(texts):
+    """Responder that returns recorded response texts in turn, starting over when they run out."""
+    replies = itertools.cycle(texts)
+    lock = threading.Lock()
+
+    def responder(params):
+        with lock:
+            return next(replies)
+
+    return responder
+
+
+def load_recordings(path):
+    # A JSON list of response texts, or of objects with a "text" field
+    with open(path, encoding="utf-8") as f:
+        recordings = json.load(f)
+    return [item["text"] if isinstance(item, dict) else item for item in recordings]
+
+
+def malform(text):
+    # Drops the comma after the first string value, so that insight no longer decodes but the rest do
+    return re.sub(r'",(\s*")', r'"\1', text, count=1)
+
+
+def make_message(params, text):
+    prompt_chars = len(json.dumps(params.get("system", ""))) + len(json.dumps(params["messages"]))
+    return {
+        "id": f"msg_{uuid.uuid4().hex}",
+        "type": "message",
+        "role": "assistant",
+        "model": params.get("model", "fake"),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {
+            "input_tokens": prompt_chars // 4,
+            "output_tokens": len(text) // 4,
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0,
+        },
+    }
+
+
+STREAM_CHUNK_TOKENS = 16
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class FakeAnthropicServer:
+    """Threaded HTTP server answering Messages and Message Batches requests.
+
+    ``responder(params) -> str`` produces the text of each reply; batches
+    report ``in_progress`` until ``batch_processing_seconds`` have passed.
+    Messages replies wait ``first_token_seconds`` and then produce output at
+    ``tokens_per_second`` (no delay when None). A ``rate_limit_rate`` share
+    of them is answered with a 429 and a ``retry_after_ms`` hint, and a
+    ``malformed_rate`` share has one insight's JSON broken. Failures are
+    drawn from a generator seeded with ``seed``.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, responder=canned_response_text, batch_processing_seconds=0.0,
+                 first_token_seconds=0.0, tokens_per_second=None, rate_limit_rate=0.0, malformed_rate=0.0,
+                 retry_after_ms=100, seed=None):
+        self.responder = responder
+        self.batch_processing_seconds = batch_processing_seconds
+        self.first_token_seconds = first_token_seconds
+        self.tokens_per_second = tokens_per_second
+        self.rate_limit_rate = rate_limit_rate
+        self.malformed_rate = malformed_rate
+        self.retry_after_ms = retry_after_ms
+        self.batches = {}
+        self.request_count = 0
+        self.rate_limited_count = 0
+        self.malformed_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def _failure(self):
+        with self._lock:
+            roll = self._random.random()
+            if roll < self.rate_limit_rate:
+                self.rate_limited_count += 1
+                return "rate_limit"
+            if roll < self.rate_limit_rate + self.malformed_rate:
+                self.malformed_count += 1
+                return "malformed"
+        return None
+
+    def _output_seconds(self, tokens):
+        return tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def _batch_json(self, batch_id):
+        batch = self.batches[batch_id]
+        ended = time.time() - batch["created_at"] >= self.batch_processing_seconds
+        count = len(batch["results"])
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else count,
+                "succeeded": count if ended else 0,
+                "errored": 0,
+                "canceled": 0,
+                "expired": 0,
+            },
+            "created_at": _iso(batch["created_at"]),
+            "expires_at": _iso(batch["created_at"] + timedelta(days=1).total_seconds()),
+            "ended_at": _iso(time.time()) if ended else None,
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": f"{self.base_url}/v1/messages/batches/{batch_id}/results" if ended else None,
+        }
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, content_type="application/json", headers=None):
+                data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _event(self, data):
+                self.wfile.write(f"event: {data['type']}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            def _stream(self, message):
+                # HTTP/1.0 without a Content-Length: the body ends when the connection closes
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                text = message["content"][0]["text"]
+                self._event({
+                    "type": "message_start",
+                    "message": {
+                        **message,
+                        "content": [],
+                        "stop_reason": None,
+                        "usage": {**message["usage"], "output_tokens": 0},
+                    },
+                })
+                self._event({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+                time.sleep(server.first_token_seconds)
+                # Deltas of about STREAM_CHUNK_TOKENS tokens at four characters per token
+                step = STREAM_CHUNK_TOKENS * 4
+                for start in range(0, len(text), step):
+                    self._event({
+                        "type": "content_block_delta",
+                        "index": 0,
+                        "delta": {"type": "text_delta", "text": text[start:start + step]},
+                    })
+                    time.sleep(server._output_seconds(STREAM_CHUNK_TOKENS))
+                self._event({"type": "content_block_stop", "index": 0})
+                self._event({
+                    "type": "message_delta",
+                    "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                    "usage": {"output_tokens": message["usage"]["output_tokens"]},
+                })
+                self._event({"type": "message_stop"})
+
+            def _not_found(self):
+                self._send(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.request_count += 1
+
+                if self.path == "/v1/messages":
+                    failure = server._failure()
+                    if failure == "rate_limit":
+                        self._send(
+                            429,
+                            {"type": "error", "error": {"type": "rate_limit_error", "message": "Rate limited"}},
+                            headers={"retry-after-ms": str(server.retry_after_ms)},
+                        )
+                        return
+                    text = server.responder(body)
+                    if failure == "malformed":
+                        text = malform(text)
+                    message = make_message(body, text)
+                    if body.get("stream"):
+                        self._stream(message)
+                    else:
+                        time.sleep(server.first_token_seconds + server._output_seconds(message["usage"]["output_tokens"]))
+                        self._send(200, message)
+                elif self.path == "/v1/messages/batches":
+                    batch_id = f"msgbatch_{uuid.uuid4().hex}"
+                    results = [
+                        {
+                            "custom_id": request["custom_id"],
+                            "result": {
+                                "type": "succeeded",
+                                "message": make_message(request["params"], server.responder(request["params"])),
+                            },
+                        }
+                        for request in body["requests"]
+                    ]
+                    with server._lock:
+                        server.batches[batch_id] = {"created_at": time.time(), "results": results}
+                    self._send(200, server._batch_json(batch_id))
+                else:
+                    self._not_found()
+
+            def do_GET(self):
+                match = re.fullmatch(r"/v1/messages/batches/([\w-]+)(/results)?", self.path.split("?")[0])
+                if not match or match.group(1) not in server.batches:
+                    self._not_found()
+                    return
+
+                batch_id = match.group(1)
+                if match.group(2):
+                    lines = "\n".join(json.dumps(r) for r in server.batches[batch_id]["results"])
+                    self._send(200, lines.encode("utf-8"), "application/binary")
+                else:
+                    self._send(200, server._batch_json(batch_id))
+
+        return Handler
+
+
+def add_backend_arguments(parser):
+    parser.add_argument("--first-token-ms", type=float, default=0.0, help="Delay before the first output token")
+    parser.add_argument("--tokens-per-second", type=float, help="Output token rate (default: instant)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with a 429")
+    parser.add_argument("--malformed-rate", type=float, default=0.0,
+                        help="Share of responses with one insight's JSON broken")
+    parser.add_argument("--recordings", help="JSON list of recorded response texts to replay instead of canned ones")
+    parser.add_argument("--seed", type=int, help="Seed for the injected failures")
+
+
+def backend_options(args):
+    """``FakeAnthropicServer`` keyword arguments from ``add_backend_arguments`` options."""
+    options = {
+        "first_token_seconds": args.first_token_ms / 1000,
+        "tokens_per_second": args.tokens_per_second,
+        "rate_limit_rate": args.rate_limit_rate,
+        "malformed_rate": args.malformed_rate,
+        "seed": args.seed,
+    }
+    if args.recordings:
+        options["responder"] = replay_responder(load_recordings(args.recordings))
+    return options
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m newsletter_core.fake_api", description=__doc__.split("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--batch-seconds", type=float, default=0.0, help="How long batches stay in_progress")
+    add_backend_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = FakeAnthropicServer(args.host, args.port, batch_processing_seconds=args.batch_seconds,
+                                 **backend_options(args))
+    print(f"Fake Anthropic API listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
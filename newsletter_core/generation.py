@@ -0,0 +1,325 @@
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from . import config
+from .cache import ResponseCache
+from .metrics import RunMetrics, elapsed_ms, sum_usage, usage_dict
+from .parsing import InsightStreamParser
+from .prompts import (
+    build_duplicate_request,
+    build_item_request,
+    build_refine_request,
+    build_repair_request,
+    build_requests,
+)
+from .routing import route_requests
+
+# Used for requests that do not name their own model or max_tokens
+MODEL = config.DEFAULT_MODEL
+MAX_TOKENS = config.MAX_TOKENS_CEILING
+
+SECTIONS = ("ai", "pm")
+
+
+def _call(client, request, on_article=None, stream=False):
+    # One API call, parsed in a single pass as the text arrives
+    parser = InsightStreamParser()
+    # draft_model is routing for _generate, not a Messages API parameter
+    params = {"model": MODEL, "max_tokens": MAX_TOKENS, **request}
+    params.pop("draft_model", None)
+    timing = {"ttft_ms": None, "call_ms": 0.0, "parse_ms": 0.0}
+    started = time.perf_counter()
+    if stream:
+        chunks = []
+        with client.messages.stream(**params) as response:
+            for text in response.text_stream:
+                if timing["ttft_ms"] is None:
+                    timing["ttft_ms"] = elapsed_ms(started)
+                chunks.append(text)
+                parse_started = time.perf_counter()
+                articles = parser.feed(text)
+                timing["parse_ms"] += time.perf_counter() - parse_started
+                for article in articles:
+                    if on_article:
+                        on_article(article)
+            usage = usage_dict(response.get_final_message().usage)
+        text = "".join(chunks)
+    else:
+        message = client.messages.create(**params)
+        text = message.content[0].text
+        parse_started = time.perf_counter()
+        parser.feed(text)
+        timing["parse_ms"] += time.perf_counter() - parse_started
+        usage = usage_dict(message.usage)
+
+    parser.finish()
+    timing["call_ms"] = elapsed_ms(started)
+    timing["parse_ms"] = round(timing["parse_ms"] * 1000, 1)
+    return parser, text, {**usage, **timing}
+
+
+def _combine_stats(stats):
+    # Tokens and durations add up across the draft, main and repair calls;
+    # time to first token is that of the first call that streamed
+    combined = sum_usage(stats)
+    combined["ttft_ms"] = next((s["ttft_ms"] for s in stats if s["ttft_ms"] is not None), None)
+    combined["call_ms"] = round(sum(s["call_ms"] for s in stats), 1)
+    combined["parse_ms"] = round(sum(s["parse_ms"] for s in stats), 1)
+    combined["calls"] = sum(s.get("calls", 1) for s in stats)
+    return combined
+
+
+def _generate(client, request, on_article, stream, count=None):
+    # With ``count``, no more than that many insights are kept or reported, however many the model writes
+    stats = []
+    reported = []
+
+    def report(article):
+        if on_article and (count is None or len(reported) < count):
+            reported.append(article)
+            on_article(article)
+
+    draft_model = request.get("draft_model")
+    if draft_model:
+        # A fast model writes the draft; the section's model only has to refine it
+        request = {k: v for k, v in request.items() if k != "draft_model"}
+        try:
+            _, draft_text, draft_stats = _call(client, {**request, "model": draft_model})
+        except ValueError:
+            # An unparseable draft is not worth refining; write the section directly
+            pass
+        else:
+            stats.append(draft_stats)
+            request = build_refine_request(request, draft_text)
+
+    parser, text, call_stats = _call(client, request, report, stream)
+    articles = parser.items[:count]
+    stats.append(call_stats)
+
+    # Ask again for the broken items only, instead of throwing the section away; after a cut-off
+    # the missing items are asked for too, and without a count only the conversation knows how many
+    if count is not None:
+        wanted = count - len(articles)
+    else:
+        wanted = None if parser.truncated else len(parser.invalid)
+    if (parser.invalid or parser.truncated) and wanted != 0:
+        repaired = []
+
+        def on_repaired(article):
+            if wanted is None or len(repaired) < wanted:
+                repaired.append(article)
+                report(article)
+
+        try:
+            repair, _, repair_stats = _call(
+                client, build_repair_request(request, text, parser.invalid, parser.truncated), on_repaired, stream
+            )
+        except ValueError:
+            repair = None
+        else:
+            stats.append(repair_stats)
+        if repair is not None:
+            articles += repair.items[:wanted]
+
+    if not articles:
+        problems = "; ".join(f"insight {position}: {problem}" for position, problem in parser.invalid)
+        raise ValueError(f"No valid insights in response ({problems})")
+    return articles, _combine_stats(stats)
+
+
+def generate_section(client, request, on_article=None, count=None):
+    return _generate(client, request, None, stream=False, count=count)
+
+
+def stream_section(client, request, on_article=None, count=None):
+    # Each insight is reported through on_article as soon as its object closes
+    return _generate(client, request, on_article, stream=True, count=count)
+
+
+def _replace_duplicates(client, request, articles, stats, dedup, on_article, stream):
+    # Insights too close to archived ones are asked for again, once; any that
+    # still repeat are kept at the end, marked with the insight they resemble
+    import anthropic
+
+    fresh, duplicates = [], []
+    for article in articles:
+        matches = dedup.find_duplicates(article)
+        if matches:
+            duplicates.append((article, matches[0][2]))
+        else:
+            fresh.append(article)
+    if not duplicates:
+        return articles, stats
+
+    accepted = []
+
+    def on_replacement(article):
+        if len(accepted) < len(duplicates) and not dedup.find_duplicates(article):
+            accepted.append(article)
+            if on_article:
+                on_article(article)
+
+    try:
+        parser, _, call_stats = _call(
+            client, build_duplicate_request(request, articles, duplicates), on_replacement, stream
+        )
+    except (anthropic.APIError, ValueError) as e:
+        # The section is still usable with its duplicates, so a failed retry is only recorded
+        stats = {**stats, "calls": stats["calls"] + 1, "duplicate_retry_error": str(e)}
+    else:
+        if not stream:
+            for article in parser.items:
+                on_replacement(article)
+        stats = _combine_stats([stats, call_stats])
+
+    unresolved = [
+        {**article, "duplicate_of": title} for article, title in duplicates[len(accepted):]
+    ]
+    return fresh + accepted + unresolved, stats
+
+
+def _run_section(client, request, key, events, cache, force_refresh, stream, dedup, count):
+    try:
+        cache_key = ResponseCache.key(request, MODEL, MAX_TOKENS)
+        articles = None
+        if cache is not None and not force_refresh:
+            articles = cache.get(cache_key)
+        if articles is not None:
+            events.put((key, "cached", articles))
+            return
+
+        def emit(article):
+            # Duplicates are held back until the replacement round has run
+            if dedup is None or not dedup.find_duplicates(article):
+                events.put((key, "article", article))
+
+        on_article = emit if stream else None
+        worker = stream_section if stream else generate_section
+        articles, stats = worker(client, request, on_article, count)
+        if dedup is not None:
+            articles, stats = _replace_duplicates(client, request, articles, stats, dedup, on_article, stream)
+        if cache is not None:
+            cache.set(cache_key, articles)
+        events.put((key, "usage", stats))
+        events.put((key, "done", articles))
+    except Exception as e:
+        events.put((key, "error", e))
+
+
+def iter_section_events(client, requests, cache=None, force_refresh=False, stream=False, dedup=None, counts=None):
+    """Generates every section concurrently and yields ``(key, kind, payload)`` events.
+
+    ``kind`` is ``"article"`` for a single streamed insight, ``"usage"`` with
+    the token counts and timings of a section's API calls, ``"done"`` or ``"cached"`` with
+    the section's full article list, or ``"error"`` with the exception that
+    ended the section. Events are yielded on the caller's thread, so UI code
+    can render them directly.
+
+    With an ``InsightIndex`` as ``dedup``, insights that repeat archived ones
+    are replaced by one follow-up request per section; streamed ``"article"``
+    events only ever carry insights that passed that check. ``counts`` maps
+    section keys to the number of insights requested; a section never
+    yields more than that.
+    """
+    events = queue.Queue()
+    with ThreadPoolExecutor(max_workers=len(requests)) as executor:
+        for key, request in requests.items():
+            count = counts.get(key) if counts else None
+            executor.submit(_run_section, client, request, key, events, cache, force_refresh, stream, dedup, count)
+
+        finished = 0
+        while finished < len(requests):
+            event = events.get()
+            if event[1] in ("done", "cached", "error"):
+                finished += 1
+            yield event
+
+
+def recent_titles(dedup):
+    """Per-section titles of the latest archived insights, for ``build_requests(avoid_titles=...)``."""
+    dedup.refresh()
+    return {section: dedup.recent_titles(section) for section in SECTIONS}
+
+
+def build_newsletter(issue_date, results, ai_topics, pm_topics, team_context=""):
+    # Create newsletter object, keeping any section that succeeded
+    return {
+        "date": issue_date.strftime("%B %d, %Y"),
+        "timestamp": datetime.now().isoformat(),
+        "ai_articles": results.get("ai", []),
+        "pm_articles": results.get("pm", []),
+        "ai_topics": ai_topics,
+        "pm_topics": pm_topics,
+        "team_context": team_context
+    }
+
+
+def regenerate_insight(client, newsletter, section, position, dedup=None, models=None):
+    """Replaces one insight with a freshly generated one.
+
+    Only a single item is requested, with the newsletter's other titles as
+    exclusions. Returns ``(newsletter, stats)`` where ``newsletter`` is a
+    copy with the new insight at ``position``; the original is not modified.
+    """
+    articles = newsletter[f"{section}_articles"]
+    request = build_item_request(
+        section,
+        newsletter[f"{section}_topics"],
+        newsletter.get("team_context", ""),
+        keep_titles=[article["title"] for i, article in enumerate(articles) if i != position],
+        replaced_title=articles[position]["title"],
+    )
+    request = route_requests({section: request}, {section: 1}, models)[section]
+    replacements, stats = generate_section(client, request, count=1)
+    if dedup is not None:
+        replacements, stats = _replace_duplicates(client, request, replacements[:1], stats, dedup, None, False)
+
+    updated = dict(newsletter)
+    updated[f"{section}_articles"] = articles[:position] + replacements[:1] + articles[position + 1:]
+    return updated, stats
+
+
+def generate_newsletter(client, issue_date, ai_topics, pm_topics, num_ai, num_pm, team_context="",
+                        cache=None, force_refresh=False, dedup=None, stream=False, on_event=None,
+                        models=None, draft_refine=False):
+    """Generates one newsletter without any UI.
+
+    Returns ``(newsletter, errors, usage)``; ``newsletter`` is None only when
+    every section failed, ``errors`` maps section keys to error messages and
+    ``usage`` holds the summed token counts of the API calls that were made.
+    The newsletter's ``metrics`` entry records the run's timings and tokens.
+    With an ``InsightIndex`` as ``dedup``, recent titles are excluded in the
+    prompts and repeated insights are regenerated. ``on_event(key, kind,
+    payload)`` sees every ``iter_section_events`` event, e.g. for progress.
+    ``models`` and ``draft_refine`` are passed to ``route_requests``.
+    """
+    metrics = RunMetrics()
+    counts = {"ai": num_ai, "pm": num_pm}
+    with metrics.stage("prompts"):
+        avoid_titles = recent_titles(dedup) if dedup is not None else None
+        requests = route_requests(
+            build_requests(ai_topics, pm_topics, num_ai, num_pm, team_context, avoid_titles=avoid_titles),
+            counts,
+            models,
+            draft_refine,
+        )
+    results = {}
+    errors = {}
+    for key, kind, payload in iter_section_events(client, requests, cache, force_refresh, stream, dedup, counts):
+        if on_event:
+            on_event(key, kind, payload)
+        if kind == "error":
+            errors[key] = str(payload)
+        elif kind == "usage":
+            metrics.record_section(key, payload)
+        elif kind in ("done", "cached"):
+            results[key] = payload
+
+    run = metrics.finish()
+    if not results:
+        return None, errors, run["tokens"]
+    newsletter = build_newsletter(issue_date, results, ai_topics, pm_topics, team_context)
+    newsletter["metrics"] = run
+    return newsletter, errors, run["tokens"]
@@ -0,0 +1,266 @@
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from . import config
+from .archive import NewsletterArchive
+from .cache import ResponseCache
+from .db import connect, ensure_parent_dir
+from .generation import SECTIONS, generate_newsletter
+
+ACTIVE_STATES = ("queued", "running")
+# SQL placeholders for ACTIVE_STATES, e.g. "status IN (?, ?)"
+ACTIVE_PLACEHOLDERS = ", ".join("?" * len(ACTIVE_STATES))
+
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def owner_alive(owner):
+    """False only if ``owner`` ran on this machine and its process has exited."""
+    host, _, pid = owner.rpartition(":")
+    # Other hosts and containers have their own pids, and on Windows os.kill would terminate the process;
+    # there the heartbeat alone decides
+    if owner == OWNER or host != socket.gethostname() or os.name == "nt":
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Running as another user
+        pass
+    return True
+
+
+def job_key(params):
+    # Identical settings give the same key, so a double submit joins the running job
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class JobQueue:
+    """Newsletter generation jobs run on a shared pool of worker threads.
+
+    Job state lives in SQLite so any session can poll a job by id, and the
+    finished newsletter is saved to the archive. Insights written so far are
+    kept in memory while a job runs, so progress polls can show them.
+    ``params`` holds the ``generate_newsletter`` settings with ``date`` as
+    an ISO string, plus ``stream``, ``avoid_repeats``, ``models`` and
+    ``draft_refine``. With ``draft_config``, the newsletter is saved as that
+    saved configuration's draft and replaces its earlier drafts of the issue;
+    a draft missing a section is not saved, so the scheduler tries it again.
+
+    Several processes (app servers, cron runs of the CLI) can share the jobs
+    database. Each job records the process that runs it, which refreshes a
+    heartbeat until the job ends; a job is only marked interrupted once that
+    process is gone or its heartbeat is ``JOB_STALE_SECONDS`` old.
+    """
+
+    def __init__(self, path=config.JOBS_PATH, archive=None, cache=None, max_workers=config.JOB_WORKERS):
+        self.path = path
+        self.archive = archive or NewsletterArchive()
+        self.cache = cache or ResponseCache()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="newsletter-job")
+        self._live = {}
+        self._lock = threading.Lock()
+        self._heartbeat = None
+        ensure_parent_dir(path)
+        with connect(self.path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " key TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " params TEXT NOT NULL,"
+                " progress TEXT NOT NULL,"
+                " errors TEXT NOT NULL,"
+                " newsletter_id INTEGER,"
+                " error TEXT,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " owner TEXT NOT NULL,"
+                " heartbeat REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs (key, status)")
+            self._reap(conn)
+
+    @staticmethod
+    def _reap(conn):
+        # Worker threads die with their process, so jobs whose process is gone or silent cannot complete
+        now = time.time()
+        rows = conn.execute(
+            f"SELECT id, owner, heartbeat FROM jobs WHERE status IN ({ACTIVE_PLACEHOLDERS})", ACTIVE_STATES
+        ).fetchall()
+        interrupted = [
+            (now, job_id) for job_id, owner, heartbeat in rows
+            if heartbeat < now - config.JOB_STALE_SECONDS or not owner_alive(owner)
+        ]
+        conn.executemany(
+            "UPDATE jobs SET status = 'error', error = 'Interrupted by a restart', updated_at = ? WHERE id = ?",
+            interrupted
+        )
+
+    def _beat(self):
+        while True:
+            time.sleep(config.JOB_HEARTBEAT_SECONDS)
+            with self._lock:
+                job_ids = list(self._live)
+            if job_ids:
+                with connect(self.path) as conn:
+                    conn.execute(
+                        f"UPDATE jobs SET heartbeat = ? WHERE id IN ({', '.join('?' * len(job_ids))})",
+                        [time.time()] + job_ids
+                    )
+
+    def _update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        for name in ("progress", "errors"):
+            if name in fields:
+                fields[name] = json.dumps(fields[name])
+        with connect(self.path) as conn:
+            conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in fields)} WHERE id = ?",
+                list(fields.values()) + [job_id]
+            )
+
+    def submit(self, client, params):
+        """Queues a generation and returns its job id, or the id of an identical job still in progress."""
+        key = job_key(params)
+        with self._lock:
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(target=self._beat, name="newsletter-job-heartbeat", daemon=True)
+                self._heartbeat.start()
+            with connect(self.path) as conn:
+                # A job left behind by a dead process must not be joined
+                self._reap(conn)
+                row = conn.execute(
+                    f"SELECT id FROM jobs WHERE key = ? AND status IN ({ACTIVE_PLACEHOLDERS})", (key, *ACTIVE_STATES)
+                ).fetchone()
+                if row is not None:
+                    return row[0]
+
+                job_id = uuid.uuid4().hex
+                now = time.time()
+                progress = {section: {"status": "queued", "articles": 0} for section in SECTIONS}
+                conn.execute(
+                    "INSERT INTO jobs"
+                    " (id, key, status, params, progress, errors, created_at, updated_at, owner, heartbeat)"
+                    " VALUES (?, ?, 'queued', ?, ?, '{}', ?, ?, ?, ?)",
+                    (job_id, key, json.dumps(params), json.dumps(progress), now, now, OWNER, now)
+                )
+            self._live[job_id] = {section: [] for section in SECTIONS}
+        self._executor.submit(self._run, job_id, client, params, progress)
+        return job_id
+
+    def _run(self, job_id, client, params, progress):
+        live = self._live[job_id]
+        for section in SECTIONS:
+            progress[section]["status"] = "running"
+        self._update(job_id, status="running", progress=progress)
+
+        def on_event(key, kind, payload):
+            if kind == "article":
+                live[key].append(payload)
+                progress[key]["articles"] = len(live[key])
+            elif kind in ("done", "cached"):
+                live[key][:] = payload
+                progress[key] = {"status": kind, "articles": len(payload)}
+            elif kind == "error":
+                progress[key] = {"status": "error", "articles": 0, "error": str(payload)}
+            else:
+                return
+            self._update(job_id, progress=progress)
+
+        try:
+            newsletter, errors, _ = generate_newsletter(
+                client,
+                date.fromisoformat(params["date"]),
+                params["ai_topics"],
+                params["pm_topics"],
+                params["num_ai"],
+                params["num_pm"],
+                params["team_context"],
+                cache=self.cache,
+                force_refresh=params.get("force_refresh", False),
+                dedup=self.archive.insights if params.get("avoid_repeats") else None,
+                stream=params.get("stream", False),
+                on_event=on_event,
+                models=params.get("models"),
+                draft_refine=params.get("draft_refine", False),
+            )
+            if newsletter is None:
+                self._update(job_id, status="error", errors=errors, error="Both sections failed")
+            elif params.get("draft_config") and errors:
+                # A saved draft counts as the issue being done, so an incomplete one would never be retried
+                self._update(
+                    job_id, status="error", errors=errors, error=f"Draft not saved: {', '.join(errors)} section failed"
+                )
+            else:
+                stale = []
+                if params.get("draft_config"):
+                    newsletter["config_name"] = params["draft_config"]
+                    newsletter["draft"] = True
+                    stale = [
+                        draft["id"] for draft in self.archive.drafts(params["draft_config"])
+                        if draft["issue_date"] == params["date"]
+                    ]
+                newsletter_id = self.archive.add(newsletter)
+                for draft_id in stale:
+                    self.archive.delete(draft_id)
+                self._update(job_id, status="done", errors=errors, newsletter_id=newsletter_id)
+        except Exception as e:
+            self._update(job_id, status="error", error=str(e))
+        finally:
+            with self._lock:
+                self._live.pop(job_id, None)
+
+    def get(self, job_id):
+        """The job's status, progress and result, or None for an unknown id.
+
+        While the job runs, ``articles`` holds the insights written so far per section.
+        """
+        with connect(self.path) as conn:
+            row = conn.execute(
+                "SELECT status, params, progress, errors, newsletter_id, error FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        with self._lock:
+            articles = {section: list(items) for section, items in self._live.get(job_id, {}).items()}
+        return {
+            "id": job_id,
+            "status": row[0],
+            "params": json.loads(row[1]),
+            "progress": json.loads(row[2]),
+            "errors": json.loads(row[3]),
+            "newsletter_id": row[4],
+            "error": row[5],
+            "articles": articles,
+        }
+
+    def counts(self):
+        with connect(self.path) as conn:
+            rows = conn.execute(
+                f"SELECT status, COUNT(*) FROM jobs WHERE status IN ({ACTIVE_PLACEHOLDERS}) GROUP BY status",
+                ACTIVE_STATES
+            ).fetchall()
+        return {**dict.fromkeys(ACTIVE_STATES, 0), **dict(rows)}
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Returns the process-wide job queue, so every session shares its workers."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+        return _job_queue
@@ -0,0 +1,120 @@
+import json
+import time
+from contextlib import contextmanager
+
+USAGE_FIELDS = ("input_tokens", "cache_creation_input_tokens", "cache_read_input_tokens", "output_tokens")
+TIMING_FIELDS = ("ttft_ms", "call_ms", "parse_ms")
+
+
+def usage_dict(usage):
+    # Cache fields are None on responses that did not touch the prompt cache
+    return {field: getattr(usage, field, None) or 0 for field in USAGE_FIELDS}
+
+
+def sum_usage(usages):
+    total = dict.fromkeys(USAGE_FIELDS, 0)
+    for usage in usages:
+        for field in USAGE_FIELDS:
+            total[field] += usage.get(field, 0)
+    return total
+
+
+def format_usage(usage):
+    return (
+        f"input {usage['input_tokens']} uncached / {usage['cache_read_input_tokens']} cache read"
+        f" / {usage['cache_creation_input_tokens']} cache write, output {usage['output_tokens']}"
+    )
+
+
+def elapsed_ms(started):
+    """Milliseconds since a ``time.perf_counter()`` reading."""
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+class RunMetrics:
+    """Timings and token counts of one newsletter generation.
+
+    Stages (prompt building, rendering, ...) are timed with ``stage``; the
+    per-section API stats come from the ``"usage"`` events of
+    ``iter_section_events``.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.sections = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = round(self.stages.get(name, 0) + elapsed_ms(started), 1)
+
+    def record_section(self, key, stats):
+        self.sections[key] = stats
+
+    def finish(self):
+        self.stages["total"] = elapsed_ms(self._started)
+        return self.as_dict()
+
+    def as_dict(self):
+        return {
+            "stages": dict(self.stages),
+            "sections": {key: dict(stats) for key, stats in self.sections.items()},
+            "tokens": sum_usage(self.sections.values()),
+        }
+
+
+def flatten(metrics):
+    """``{"stages": {"total": 1.0}, "sections": {"ai": {...}}}`` -> ``{"total_ms": 1.0, "ai.call_ms": ...}``."""
+    flat = {f"{name}_ms": value for name, value in metrics.get("stages", {}).items()}
+    for key, stats in metrics.get("sections", {}).items():
+        for field in TIMING_FIELDS + USAGE_FIELDS:
+            if stats.get(field) is not None:
+                flat[f"{key}.{field}"] = stats[field]
+    for field, value in metrics.get("tokens", {}).items():
+        flat[f"tokens.{field}"] = value
+    return flat
+
+
+def percentile(values, q):
+    # Nearest-rank percentile; values must be non-empty
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(runs):
+    """Per-metric count, mean, p50 and p95 over a list of ``RunMetrics.as_dict()`` results."""
+    values = {}
+    for run in runs:
+        for name, value in flatten(run).items():
+            values.setdefault(name, []).append(value)
+    return {
+        name: {
+            "count": len(series),
+            "mean": round(sum(series) / len(series), 1),
+            "p50": percentile(series, 50),
+            "p95": percentile(series, 95),
+        }
+        for name, series in sorted(values.items())
+    }
+
+
+def to_json(summary):
+    return json.dumps(summary, indent=2)
+
+
+def to_prometheus(summary):
+    lines = [
+        "# HELP newsletter_run_metric Newsletter generation timings (ms) and token counts over recent runs.",
+        "# TYPE newsletter_run_metric summary",
+    ]
+    for name, stats in summary.items():
+        lines.append(f'newsletter_run_metric{{name="{name}",quantile="0.5"}} {stats["p50"]}')
+        lines.append(f'newsletter_run_metric{{name="{name}",quantile="0.95"}} {stats["p95"]}')
+        lines.append(f'newsletter_run_metric_sum{{name="{name}"}} {round(stats["mean"] * stats["count"], 1)}')
+        lines.append(f'newsletter_run_metric_count{{name="{name}"}} {stats["count"]}')
+    return "\n".join(lines) + "\n"
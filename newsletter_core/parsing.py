@@ -0,0 +1,160 @@
+import json
+
+REQUIRED_FIELDS = ("title", "key_insight", "why_it_matters")
+LIST_FIELDS = ("action_items", "search_terms", "recommended_sources")
+
+
+def validate_insight(item):
+    """Checks one insight against the schema the prompts ask for.
+
+    Returns ``(insight, problems)``. List fields are normalised (a bare string
+    becomes a one-element list, a missing field an empty list), so callers can
+    rely on their shape; ``insight`` is None when ``problems`` is non-empty.
+    """
+    if not isinstance(item, dict):
+        return None, [f"expected an object, got {type(item).__name__}"]
+
+    problems = []
+    insight = dict(item)
+    for field in REQUIRED_FIELDS:
+        value = item.get(field)
+        if not isinstance(value, str) or not value.strip():
+            problems.append(f"missing or empty '{field}'")
+
+    for field in LIST_FIELDS:
+        value = item.get(field, [])
+        if isinstance(value, str):
+            value = [value]
+        if not isinstance(value, list):
+            problems.append(f"'{field}' must be a list of strings")
+            continue
+        insight[field] = [str(v) for v in value if v]
+
+    return (None, problems) if problems else (insight, [])
+
+
+class InsightStreamParser:
+    """Single-pass parser for the JSON array of insights in a model response.
+
+    Feed it text (a whole response or streamed deltas); every top-level object
+    in the array is decoded and validated as soon as its closing brace is
+    seen, and valid insights are returned from ``feed``. Anything before the
+    opening ``[`` (a ```json fence, a short preamble) is skipped, trailing
+    commas are tolerated, and objects that fail to decode or validate are
+    recorded in ``invalid`` as ``(position, problem)`` instead of failing the
+    whole array.
+    """
+
+    def __init__(self):
+        self.items = []
+        self.invalid = []
+        self.closed = False
+        self.truncated = False
+        self._started = False
+        self._seen = 0
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk):
+        completed = []
+        for ch in chunk:
+            if self.closed:
+                break
+
+            if not self._started:
+                if ch == "[":
+                    self._started = True
+                continue
+
+            if self._depth == 0:
+                # Between array elements: only separators, objects or the end are valid
+                if ch == "{":
+                    self._depth = 1
+                    self._buffer = [ch]
+                elif ch == "]":
+                    self.closed = True
+                elif not (ch.isspace() or ch == ","):
+                    if not self._seen:
+                        # A "[" in leading prose, not the array itself
+                        self._started = False
+                continue
+
+            if self._in_string:
+                self._buffer.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._buffer.append(ch)
+                self._in_string = True
+            elif ch in "{[":
+                self._buffer.append(ch)
+                self._depth += 1
+            elif ch in "}]":
+                self._drop_trailing_comma()
+                self._buffer.append(ch)
+                self._depth -= 1
+                if self._depth == 0:
+                    insight = self._close_object()
+                    if insight is not None:
+                        completed.append(insight)
+            else:
+                self._buffer.append(ch)
+        return completed
+
+    def _drop_trailing_comma(self):
+        end = len(self._buffer)
+        while end and self._buffer[end - 1].isspace():
+            end -= 1
+        if end and self._buffer[end - 1] == ",":
+            del self._buffer[end - 1]
+
+    def _close_object(self):
+        self._seen += 1
+        text = "".join(self._buffer)
+        self._buffer = []
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError as e:
+            self.invalid.append((self._seen, f"malformed JSON ({e.msg})"))
+            return None
+
+        insight, problems = validate_insight(item)
+        if problems:
+            self.invalid.append((self._seen, "; ".join(problems)))
+            return None
+        self.items.append(insight)
+        return insight
+
+    def finish(self):
+        """Raises ValueError if the response held no usable array.
+
+        A response that was cut off after some complete objects (for
+        example at ``max_tokens``) keeps the insights parsed so far and sets
+        ``truncated``; the object it stopped in is recorded in ``invalid``.
+        """
+        if not self._started:
+            raise ValueError("Response did not contain a JSON array")
+        if not self.closed and not self._seen:
+            raise ValueError("Response ended before the first complete insight")
+        self.truncated = not self.closed
+        if self.truncated and self._depth:
+            self._seen += 1
+            self.invalid.append((self._seen, "cut off before the object was complete"))
+            self._depth = 0
+            self._buffer = []
+            self._in_string = self._escape = False
+        return self.items
+
+
+def parse_insights(text):
+    """Parses a complete response; returns ``(insights, invalid)``."""
+    parser = InsightStreamParser()
+    parser.feed(text)
+    parser.finish()
+    return parser.items, parser.invalid
@@ -0,0 +1,251 @@
+import json
+from datetime import datetime
+
+AI_TOPIC_OPTIONS = [
+    "Generative AI / LLMs",
+    "Multilingual AI",
+    "AI Product Strategy",
+    "AI for E-commerce",
+    "AI Ethics & Responsible AI",
+    "Emerging AI Capabilities",
+    "AI Cost Optimization",
+    "Voice AI & Multimodal"
+]
+DEFAULT_AI_TOPICS = ["Generative AI / LLMs", "Multilingual AI", "AI Product Strategy"]
+
+PM_TOPIC_OPTIONS = [
+    "AI-First Product Management",
+    "Product Strategy",
+    "Stakeholder Management",
+    "Team Leadership",
+    "Data-Driven Decision Making",
+    "Customer Research",
+    "Product Roadmapping",
+    "Cross-functional Collaboration"
+]
+DEFAULT_PM_TOPICS = ["AI-First Product Management", "Product Strategy", "Team Leadership"]
+
+
+# The rules shared by both sections never change between sections, teams or runs, so they come
+# first as one system block marked for prompt caching. The section's own instructions and the
+# per-team user turn follow the cache breakpoint, so every request reads the same cached prefix.
+# Anthropic only caches prefixes above a per-model minimum length (1024 tokens for Sonnet and
+# Opus, 2048 for Haiku); the shared rules are long enough for the first.
+SHARED_SYSTEM_PROMPT = """You write the insight sections of "Bi-Weekly Insights: AI & Product Management", an internal newsletter read by product managers, designers, engineering leads and executives at a company that builds AI products. Each request asks for one section: either AI INSIGHTS about current developments in AI, or PM INSIGHTS about product management frameworks and practice. The section instructions after these rules say which one and what it should focus on; everything here applies to both.
+
+## Audience
+
+Readers are experienced and busy. They skim the titles, read the insights that look relevant to their work, and forward the best ones to their teams. Write for someone who already knows the basics of machine learning and product management and wants the specifics: what changed, how it works, who is doing it well, what it costs, and what to do about it. Leave out introductions, definitions of common terms, hype and filler such as "in today's fast-paced world".
+
+## Output format
+
+Return ONLY a valid JSON array, with no text before or after it and no markdown code fences. Each element is one insight object with exactly these fields:
+
+- "title" (string): a specific, compelling headline of at most 12 words. Name the concrete subject ("Speculative decoding cuts chat latency without a quality trade-off"), not a generic category ("Improving LLM performance").
+- "key_insight" (string): the substance of the insight, 5-7 sentences in one paragraph. Explain what it is, how it works in practice, who is applying it and how, and the trade-offs or pitfalls. Include concrete details such as numbers, benchmarks, product names or named practitioners when you are confident they are accurate.
+- "why_it_matters" (string): 2-3 sentences on the strategic implications for the readers' teams and roadmaps. Do not restate the key insight.
+- "action_items" (array of 2-3 strings): specific things a product manager could start within the next two weeks, each beginning with a verb.
+- "search_terms" (array of 2-3 strings): precise queries that surface current coverage of the subject in a search engine, such as "speculative decoding production latency", never single generic words.
+- "recommended_sources" (array of 2-3 strings): names of publications, newsletters, blogs, podcasts or books where readers can go deeper, such as "Lenny's Newsletter" or "The Batch". Give names only, never URLs.
+
+Use plain text inside the strings: no markdown, HTML or emoji. Escape double quotes inside strings, do not leave trailing commas, and do not add fields that are not listed above. Every field is required and must not be empty.
+
+One well-formed element looks like this:
+
+{
+  "title": "Route routine requests to smaller models to cut inference cost",
+  "key_insight": "Many AI products send every request to their largest model, although most traffic is routine: short questions, classifications and reformatting. Teams increasingly put a lightweight router in front of several models, sending simple requests to a small, fast model and escalating only the hard ones. The router can be a set of rules, a small classifier trained on logged traffic, or the small model itself flagging low confidence. Providers' own pricing shows small models costing a fraction of frontier models per token, so the savings grow with the share of routine traffic. The main risks are quality regressions on requests the router misjudges and the extra complexity of evaluating several models. Successful teams start with one high-volume, low-risk use case and compare quality on a held-out sample before widening the rollout.",
+  "why_it_matters": "Inference cost often decides whether an AI feature can be offered to every user or only to a premium tier. Routing turns model choice into a product decision that PMs can tune per use case instead of a one-time engineering default.",
+  "action_items": ["List the three highest-volume request types and estimate how many a smaller model could handle", "Run a two-week pilot routing one low-risk request type to a smaller model and compare quality and cost", "Agree with engineering on the quality metric that would trigger escalation to the larger model"],
+  "search_terms": ["LLM model routing cost quality", "small language model cascade production"],
+  "recommended_sources": ["The Batch", "Latent Space", "Chip Huyen's blog"]
+}
+
+## Accuracy
+
+- Never invent URLs, quotes, paper titles, statistics or product launches. Readers act on these insights, and one fabricated number discredits the whole newsletter.
+- When you are not certain of an exact figure, describe the magnitude or direction instead ("roughly half the cost", "several times faster") or leave the number out.
+- Attribute claims to the company, team or person they come from, and say when something is an early signal rather than an established practice.
+- Your knowledge has a cutoff date. Prefer developments and practices that are still relevant over one-off announcements that may be outdated, and let the search terms point readers to the latest coverage.
+
+## Choosing insights
+
+- Each insight must cover a clearly different subject. Do not split one idea into several insights, and do not return two insights about the same company, framework or technique.
+- Spread the insights across the requested topics. When there are more topics than insights, pick those with the most substance for the team; when there are fewer, cover different angles of the same topic.
+- Favour insights that lead to a decision or an experiment over ones that are merely interesting.
+- When a team context is given, tailor the examples, implications and action items to that team's product and users.
+- When the request lists insights from recent issues, treat them as already covered: choose different subjects, not rephrasings of the same ones.
+- Return exactly the number of insights requested.
+
+## Follow-up turns
+
+The conversation may continue after your array:
+- If some insights were invalid or the array was cut off, you will be asked for replacements or for the missing insights only. Return just those, without repeating the valid ones.
+- If some insights repeat ones from earlier issues, you will be asked for new insights on different angles of the same topics.
+- If you are shown a first draft, you will be asked to refine it: keep the same number of insights and topics, and make every field more specific, accurate and actionable.
+In every case the answer is again ONLY a valid JSON array in the format above."""
+
+AI_SECTION_PROMPT = """## This section: AI INSIGHTS
+
+You are an expert AI analyst curating in-depth insights for product managers.
+
+In each key_insight, cover:
+- What the trend/development is
+- Key technical details or capabilities
+- How leading companies are approaching this
+- Specific metrics, benchmarks, or data points where relevant
+- Practical implementation considerations
+
+why_it_matters covers the strategic implications for AI product teams.
+
+Focus on:
+- Developments and trends that are CURRENT and ONGOING
+- Strategic implications with specific examples
+- Practical considerations with concrete details
+- Real companies and products (OpenAI, Anthropic, Google, Meta, etc.)
+- Include specific numbers, benchmarks, or comparisons where possible"""
+
+PM_SECTION_PROMPT = """## This section: PM INSIGHTS
+
+You are an expert curator of product management insights for senior PMs. Each title names a framework, principle, or best practice.
+
+In each key_insight, cover:
+- What the framework/concept is and its origin
+- Step-by-step how to apply it in practice
+- Common pitfalls to avoid
+- Examples of companies or PMs who use this effectively
+- How it applies specifically to AI products
+
+why_it_matters covers the relevance to modern AI-first product management, and the action items are things PMs can do this week.
+
+Focus on:
+- TIMELESS frameworks and mental models with practical depth
+- Step-by-step application guidance
+- Insights from respected PM thought leaders (Lenny Rachitsky, Marty Cagan, Shreyas Doshi, etc.)
+- Specific examples and case studies
+- AI-first product management considerations"""
+
+
+def system_blocks(section_prompt):
+    # The cache breakpoint sits after the shared rules, so both sections share one cached prefix
+    return [
+        {"type": "text", "text": SHARED_SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": section_prompt},
+    ]
+
+
+def exclusions(avoid_titles):
+    # Kept in the per-team user turn so the cached system prefix stays identical
+    if not avoid_titles:
+        return ""
+    titles = "\n".join(f"- {title}" for title in avoid_titles)
+    return f"""
+
+Recent issues already covered these insights. Do not repeat them; choose different angles:
+{titles}"""
+
+
+def build_ai_request(ai_topics, num_ai, team_context="", current_date=None, avoid_titles=None):
+    # AI Insights - focused on current trends without fake URLs
+    current_date = current_date or datetime.now().strftime("%B %Y")
+    return {
+        "system": system_blocks(AI_SECTION_PROMPT),
+        "messages": [{"role": "user", "content": f"""Current date: {current_date}
+
+Generate {num_ai} comprehensive AI INSIGHTS about: {', '.join(ai_topics)}
+
+Team context: {team_context if team_context else 'Building AI products at scale'}{exclusions(avoid_titles)}"""}],
+    }
+
+
+def build_pm_request(pm_topics, num_pm, avoid_titles=None):
+    # PM Insights - timeless frameworks and wisdom
+    return {
+        "system": system_blocks(PM_SECTION_PROMPT),
+        "messages": [{"role": "user", "content": f"Generate {num_pm} comprehensive PM INSIGHTS about: {', '.join(pm_topics)}"
+                                                 f"{exclusions(avoid_titles)}"}],
+    }
+
+
+def build_requests(ai_topics, pm_topics, num_ai, num_pm, team_context="", current_date=None, avoid_titles=None):
+    """Returns the Messages API arguments (``system`` + ``messages``) for each section.
+
+    ``avoid_titles`` optionally maps section keys to titles of recent
+    insights the model should not repeat.
+    """
+    avoid_titles = avoid_titles or {}
+    return {
+        "ai": build_ai_request(ai_topics, num_ai, team_context, current_date, avoid_titles.get("ai")),
+        "pm": build_pm_request(pm_topics, num_pm, avoid_titles.get("pm")),
+    }
+
+
+def build_item_request(section, topics, team_context="", keep_titles=(), replaced_title=None, current_date=None):
+    """Request for one insight to swap into an existing newsletter."""
+    if section == "ai":
+        request = build_ai_request(topics, 1, team_context, current_date)
+    else:
+        request = build_pm_request(topics, 1)
+    note = f'\n\nThis insight replaces "{replaced_title}". Cover a clearly different angle.'
+    if keep_titles:
+        titles = "\n".join(f"- {title}" for title in keep_titles)
+        note += f"\nThe newsletter already contains these insights, so do not repeat them either:\n{titles}"
+    request["messages"][0]["content"] += note
+    return request
+
+
+def build_repair_request(request, response_text, invalid, truncated=False):
+    """Follow-up turn asking only for replacements of the invalid insights.
+
+    With ``truncated``, the response was cut off, so the turn also asks for
+    the insights that were never written.
+    """
+    problems = "\n".join(f"- Insight {position}: {problem}" for position, problem in invalid)
+    if truncated:
+        # Cut off (usually at max_tokens): whatever came after the cut was never written
+        content = "That array was cut off before it was complete."
+        if invalid:
+            content += f"\nSome insights in it were invalid:\n{problems}"
+        content += f"""
+
+Return ONLY a valid JSON array with {"corrected replacements for the invalid items, followed by " if invalid else ""}every insight still missing from the number originally requested, with every field filled in. Keep each insight concise. Do not repeat the valid insights."""
+    else:
+        content = f"""Some insights in that array were invalid:
+{problems}
+
+Return ONLY a valid JSON array with {len(invalid)} corrected replacement insight(s) for just those items, with every field filled in. Do not repeat the valid insights."""
+    return {
+        **request,
+        "messages": request["messages"] + [
+            {"role": "assistant", "content": response_text.strip()},
+            {"role": "user", "content": content},
+        ],
+    }
+
+
+def build_duplicate_request(request, articles, duplicates):
+    """Follow-up turn asking for new insights in place of ones that repeat earlier issues."""
+    repeated = "\n".join(f'- "{article["title"]}" is too close to "{title}"' for article, title in duplicates)
+    return {
+        **request,
+        "messages": request["messages"] + [
+            {"role": "assistant", "content": json.dumps(articles, indent=2)},
+            {"role": "user", "content": f"""These insights repeat ones from earlier issues:
+{repeated}
+
+Return ONLY a valid JSON array with {len(duplicates)} new replacement insight(s) on clearly different angles of the same topics, with every field filled in. Do not repeat any insight above."""},
+        ],
+    }
+
+
+def build_refine_request(request, draft_text):
+    """Turns a draft written by a faster model into the input of the final call."""
+    return {
+        **request,
+        "messages": request["messages"] + [
+            {"role": "assistant", "content": draft_text.strip()},
+            {"role": "user", "content": """That is a first draft. Refine it: make every insight more specific and accurate, sharpen the reasoning in why_it_matters, and make the action items concrete. Keep the same number of insights and the same topics.
+
+Return ONLY the refined valid JSON array."""},
+        ],
+    }
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from urllib.parse import quote_plus
+
+from .email_format import format_email
+
+RENDER_CACHE_SIZE = 32
+
+DEFAULT_SOURCES = {
+    "ai": "TechCrunch, The Verge, VentureBeat",
+    "pm": "Lenny's Newsletter, First Round Review",
+}
+
+_rendered = OrderedDict()
+_rendered_lock = threading.Lock()
+
+
+def content_key(newsletter):
+    # Covers the id and every field, so an edited or replaced newsletter gets a new key
+    return hashlib.sha256(
+        json.dumps(newsletter, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+
+
+def article_blocks(i, article, section):
+    """Preview markup for one insight: the card HTML, action items markdown and search links HTML."""
+    search_terms = article.get('search_terms', [])
+    sources = article.get('recommended_sources', [])
+    action_items = article.get('action_items', [])
+
+    card = (
+        '<div class="article-card">'
+        f"<h3>{i}. {article['title']}</h3>"
+        f'<p style="line-height: 1.7;">{article.get("key_insight", article.get("tldr", ""))}</p>'
+        f'<p style="color: #667eea; margin-top: 1rem;"><strong>💡 Why it matters:</strong> {article.get("why_it_matters", "")}</p>'
+        + (f'<p style="color: #b7791f; font-size: 0.9rem;">⚠️ Similar to an earlier insight: {article["duplicate_of"]}</p>'
+           if article.get("duplicate_of") else "")
+        + "</div>"
+    )
+
+    actions = None
+    if action_items:
+        actions = "\n\n".join(["**🎯 Action Items:**"] + [f"• {action}" for action in action_items])
+
+    search = None
+    if search_terms:
+        search_links = " | ".join(
+            f'<a href="https://www.google.com/search?q={quote_plus(term)}" target="_blank">{term}</a>'
+            for term in search_terms
+        )
+        search = (
+            '<div class="search-tip">'
+            f"🔍 <strong>Learn more:</strong> {search_links}<br>"
+            f"📚 <strong>Sources:</strong> {', '.join(sources) if sources else DEFAULT_SOURCES[section]}"
+            "</div>"
+        )
+    return {"card": card, "actions": actions, "search": search}
+
+
+def _render(newsletter):
+    return {
+        "email": format_email(newsletter),
+        # Compact, since the render cache keeps this string for every recently viewed newsletter
+        "json": json.dumps(newsletter, separators=(",", ":")),
+        "preview": {
+            section: [
+                article_blocks(i, article, section)
+                for i, article in enumerate(newsletter.get(f"{section}_articles", []), 1)
+            ]
+            for section in ("ai", "pm")
+        },
+    }
+
+
+def memoized(key, build):
+    """Returns the cached result for ``key``, calling ``build()`` on a miss.
+
+    Keeps the ``RENDER_CACHE_SIZE`` most recently used results.
+    """
+    with _rendered_lock:
+        if key in _rendered:
+            _rendered.move_to_end(key)
+            return _rendered[key]
+
+    result = build()
+    with _rendered_lock:
+        _rendered[key] = result
+        while len(_rendered) > RENDER_CACHE_SIZE:
+            _rendered.popitem(last=False)
+    return result
+
+
+def render_newsletter(newsletter):
+    """Email text, download JSON and preview blocks for a newsletter, built once per content.
+
+    Results are memoized by ``content_key``, so reruns that show an
+    unchanged newsletter skip the formatting entirely.
+    """
+    return memoized(content_key(newsletter), lambda: _render(newsletter))
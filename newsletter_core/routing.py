@@ -0,0 +1,111 @@
+from . import config
+from .client import estimate_input_tokens
+
+# Prices are USD per million tokens. Speeds are rough averages used only
+# for the pre-generation estimate: output tokens/second and seconds to the first token.
+# Prompt prefixes shorter than min_cache_tokens are never cached by the model.
+MODELS = {
+    "claude-sonnet-4-20250514": {
+        "label": "Claude Sonnet 4",
+        "input_per_mtok": 3.0,
+        "output_per_mtok": 15.0,
+        "tokens_per_second": 60,
+        "first_token_seconds": 1.0,
+        "min_cache_tokens": 1024,
+    },
+    "claude-3-5-haiku-20241022": {
+        "label": "Claude 3.5 Haiku (fast)",
+        "input_per_mtok": 0.8,
+        "output_per_mtok": 4.0,
+        "tokens_per_second": 100,
+        "first_token_seconds": 0.6,
+        "min_cache_tokens": 2048,
+    },
+    "claude-opus-4-20250514": {
+        "label": "Claude Opus 4",
+        "input_per_mtok": 15.0,
+        "output_per_mtok": 75.0,
+        "tokens_per_second": 30,
+        "first_token_seconds": 2.0,
+        "min_cache_tokens": 1024,
+    },
+}
+
+# An insight is typically ~350 output tokens; the budget leaves room for longer ones
+EXPECTED_TOKENS_PER_INSIGHT = 350
+TOKENS_PER_INSIGHT_BUDGET = 700
+RESPONSE_OVERHEAD_TOKENS = 300
+
+
+def section_models(models=None):
+    """Per-section model ids, with config defaults for any section not given."""
+    return {**config.SECTION_MODELS, **(models or {})}
+
+
+def max_tokens_for(count):
+    return min(config.MAX_TOKENS_CEILING, RESPONSE_OVERHEAD_TOKENS + count * TOKENS_PER_INSIGHT_BUDGET)
+
+
+def route_requests(requests, counts, models=None, draft_refine=False):
+    """Adds ``model`` and ``max_tokens`` to each section's request.
+
+    ``counts`` maps section keys to the number of insights asked for, so a
+    one-insight section no longer reserves the full ceiling. With
+    ``draft_refine``, the request also carries a ``draft_model``: a fast
+    model writes a draft that the section's model then refines.
+    """
+    models = section_models(models)
+    routed = {}
+    for key, request in requests.items():
+        routed[key] = {**request, "model": models[key], "max_tokens": max_tokens_for(counts[key])}
+        if draft_refine and config.DRAFT_MODEL != models[key]:
+            routed[key]["draft_model"] = config.DRAFT_MODEL
+    return routed
+
+
+def _model_info(model):
+    # Unknown models are priced and timed like the default one
+    return MODELS.get(model, MODELS[config.DEFAULT_MODEL])
+
+
+def prefix_cacheable(request):
+    """Whether the routed request's cached system prefix is long enough for its model to cache."""
+    system = request.get("system", "")
+    marked = [i for i, block in enumerate(system) if isinstance(block, dict) and "cache_control" in block]
+    if not marked:
+        return False
+    # Only the blocks up to the last breakpoint are cached
+    prefix = system[:marked[-1] + 1]
+    return estimate_input_tokens({"system": prefix}) >= _model_info(request["model"])["min_cache_tokens"]
+
+
+def _call_estimate(model, input_tokens, output_tokens):
+    info = _model_info(model)
+    cost = (input_tokens * info["input_per_mtok"] + output_tokens * info["output_per_mtok"]) / 1_000_000
+    seconds = info["first_token_seconds"] + output_tokens / info["tokens_per_second"]
+    return cost, seconds
+
+
+def estimate_run(requests, counts):
+    """Expected cost (USD) and latency (seconds) of routed requests, before sending them.
+
+    Sections run concurrently, so the total latency is the slowest section's.
+    Prompt caching and repair calls are not accounted for.
+    """
+    sections = {}
+    for key, request in requests.items():
+        params = {k: v for k, v in request.items() if k != "draft_model"}
+        input_tokens = estimate_input_tokens(params)
+        output_tokens = counts[key] * EXPECTED_TOKENS_PER_INSIGHT
+        cost, seconds = _call_estimate(request["model"], input_tokens, output_tokens)
+        if request.get("draft_model"):
+            # The refine call also reads the draft back as input
+            draft_cost, draft_seconds = _call_estimate(request["draft_model"], input_tokens, output_tokens)
+            cost += draft_cost + output_tokens * _model_info(request["model"])["input_per_mtok"] / 1_000_000
+            seconds += draft_seconds
+        sections[key] = {"model": request["model"], "cost_usd": round(cost, 4), "seconds": round(seconds, 1)}
+    return {
+        "sections": sections,
+        "cost_usd": round(sum(section["cost_usd"] for section in sections.values()), 4),
+        "seconds": max((section["seconds"] for section in sections.values()), default=0.0),
+    }
@@ -0,0 +1,242 @@
+import json
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from . import config
+from .archive import NewsletterArchive
+from .db import connect, ensure_parent_dir
+from .jobs import get_job_queue
+from .prompts import DEFAULT_AI_TOPICS, DEFAULT_PM_TOPICS
+
+
+def parse_hours(spec):
+    start, end = (int(part) for part in spec.split("-"))
+    return start, end
+
+
+def in_hours(hour, hours):
+    start, end = hours
+    # A window such as 22-5 wraps past midnight
+    return start <= hour < end if start <= end else hour >= start or hour < end
+
+
+def next_issue_date(saved, today=None):
+    """The configuration's first issue date on or after ``today``."""
+    today = today or date.today()
+    first = date.fromisoformat(saved["first_date"])
+    if today <= first:
+        return first
+    interval = saved["interval_days"]
+    return first + timedelta(days=-(-(today - first).days // interval) * interval)
+
+
+def job_params(saved, issue, force_refresh=False):
+    """``JobQueue`` params that draft ``issue`` for a saved configuration."""
+    return {
+        "date": issue.isoformat(),
+        "ai_topics": saved["ai_topics"],
+        "pm_topics": saved["pm_topics"],
+        "num_ai": saved["num_ai"],
+        "num_pm": saved["num_pm"],
+        "team_context": saved["team_context"],
+        "force_refresh": force_refresh,
+        "stream": False,
+        "avoid_repeats": True,
+        "models": saved["models"],
+        "draft_refine": saved["draft_refine"],
+        "draft_config": saved["name"],
+    }
+
+
+class Scheduler:
+    """Pre-generates the next issue of every saved configuration as an archive draft.
+
+    Saved configurations (topics, counts, team context, models and cadence)
+    live in SQLite. Once started, a daemon thread checks them every
+    ``SCHEDULE_POLL_SECONDS`` and, during the off-peak hours, queues a job
+    for each issue due within ``days_ahead`` days that has neither a draft
+    nor a published newsletter yet. The jobs share the app's worker pool and
+    rate limiter, and identical submissions join the job already running.
+    Issues whose drafts keep failing are retried with exponential backoff,
+    up to ``SCHEDULE_MAX_ATTEMPTS`` times.
+    """
+
+    def __init__(self, path=config.SCHEDULE_PATH, jobs=None, days_ahead=config.SCHEDULE_DAYS_AHEAD,
+                 off_peak_hours=config.SCHEDULE_OFF_PEAK_HOURS):
+        self.path = path
+        self._jobs = jobs
+        self.archive = jobs.archive if jobs is not None else NewsletterArchive()
+        self.days_ahead = days_ahead
+        self.off_peak_hours = parse_hours(off_peak_hours)
+        self.last_error = None
+        self._thread = None
+        self._lock = threading.Lock()
+        ensure_parent_dir(path)
+        with connect(self.path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS saved_configs ("
+                " name TEXT PRIMARY KEY,"
+                " body TEXT NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            # Drafting attempts per configuration and issue, for the retry backoff
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS draft_attempts ("
+                " name TEXT NOT NULL,"
+                " issue_date TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL,"
+                " next_attempt_at REAL NOT NULL,"
+                " PRIMARY KEY (name, issue_date))"
+            )
+
+    @property
+    def jobs(self):
+        # Only drafting needs the job queue, so saving and listing configurations never start one
+        with self._lock:
+            if self._jobs is None:
+                self._jobs = get_job_queue()
+            return self._jobs
+
+    def save(self, saved):
+        """Adds or replaces a configuration; only ``name`` is required. Returns it with the defaults filled in."""
+        saved = {
+            "name": saved["name"],
+            "ai_topics": saved.get("ai_topics", DEFAULT_AI_TOPICS),
+            "pm_topics": saved.get("pm_topics", DEFAULT_PM_TOPICS),
+            "num_ai": saved.get("num_ai", 2),
+            "num_pm": saved.get("num_pm", 2),
+            "team_context": saved.get("team_context", ""),
+            "models": saved.get("models") or {},
+            "draft_refine": saved.get("draft_refine", False),
+            "first_date": saved.get("first_date") or date.today().isoformat(),
+            "interval_days": saved.get("interval_days", config.ISSUE_INTERVAL_DAYS),
+        }
+        with connect(self.path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO saved_configs (name, body, updated_at) VALUES (?, ?, ?)",
+                (saved["name"], json.dumps(saved), time.time())
+            )
+            # Changed settings deserve a fresh set of attempts
+            conn.execute("DELETE FROM draft_attempts WHERE name = ?", (saved["name"],))
+        return saved
+
+    def configs(self):
+        with connect(self.path) as conn:
+            rows = conn.execute("SELECT body FROM saved_configs ORDER BY name").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get(self, name):
+        with connect(self.path) as conn:
+            row = conn.execute("SELECT body FROM saved_configs WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete(self, name):
+        # Drafts already generated stay in the archive until published or deleted
+        with connect(self.path) as conn:
+            conn.execute("DELETE FROM draft_attempts WHERE name = ?", (name,))
+            return conn.execute("DELETE FROM saved_configs WHERE name = ?", (name,)).rowcount > 0
+
+    def _attempts(self):
+        with connect(self.path) as conn:
+            rows = conn.execute("SELECT name, issue_date, attempts, next_attempt_at FROM draft_attempts").fetchall()
+        return {(name, issue): (attempts, next_attempt_at) for name, issue, attempts, next_attempt_at in rows}
+
+    def _record_attempt(self, name, issue, today):
+        with connect(self.path) as conn:
+            row = conn.execute(
+                "SELECT attempts FROM draft_attempts WHERE name = ? AND issue_date = ?", (name, issue.isoformat())
+            ).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            conn.execute(
+                "INSERT OR REPLACE INTO draft_attempts (name, issue_date, attempts, next_attempt_at)"
+                " VALUES (?, ?, ?, ?)",
+                (name, issue.isoformat(), attempts, time.time() + config.SCHEDULE_POLL_SECONDS * 2 ** (attempts - 1))
+            )
+            conn.execute("DELETE FROM draft_attempts WHERE issue_date < ?", (today.isoformat(),))
+
+    def gave_up(self, name, issue):
+        """Whether drafting ``issue`` (a date) failed ``SCHEDULE_MAX_ATTEMPTS`` times and is no longer retried."""
+        attempts, _ = self._attempts().get((name, issue.isoformat()), (0, 0.0))
+        return attempts >= config.SCHEDULE_MAX_ATTEMPTS
+
+    def due(self, today=None):
+        """``(config, issue_date)`` for every upcoming issue that still needs a draft.
+
+        An issue already attempted waits out its backoff first, and is left
+        out for good after ``SCHEDULE_MAX_ATTEMPTS`` attempts.
+        """
+        today = today or date.today()
+        now = time.time()
+        attempts = self._attempts()
+        due = []
+        for saved in self.configs():
+            issue = next_issue_date(saved, today)
+            if (issue - today).days > self.days_ahead:
+                continue
+            tried, next_attempt_at = attempts.get((saved["name"], issue.isoformat()), (0, 0.0))
+            if tried >= config.SCHEDULE_MAX_ATTEMPTS or next_attempt_at > now:
+                continue
+            if not self.archive.has_issue(saved["name"], issue.isoformat()):
+                due.append((saved, issue))
+        return due
+
+    def run_due(self, client, today=None):
+        """Queues a draft job for every due issue, whatever the hour; returns the job ids.
+
+        Each submission counts as an attempt: a draft that succeeds makes its
+        issue no longer due, so only failed attempts are ever retried.
+        """
+        today = today or date.today()
+        job_ids = []
+        for saved, issue in self.due(today):
+            job_ids.append(self.jobs.submit(client, job_params(saved, issue)))
+            self._record_attempt(saved["name"], issue, today)
+        return job_ids
+
+    def refresh(self, client, name, issue=None):
+        """Regenerates a configuration's draft of ``issue`` (default: its next issue), bypassing the response cache.
+
+        Returns the job id. Raises ``ValueError`` if no configuration is saved under ``name``.
+        """
+        saved = self.get(name)
+        if saved is None:
+            raise ValueError(f"No saved configuration named {name!r}")
+        return self.jobs.submit(client, job_params(saved, issue or next_issue_date(saved), force_refresh=True))
+
+    def start(self, make_client):
+        """Starts the background thread once per scheduler.
+
+        ``make_client()`` is only called when there is something to generate.
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, args=(make_client,), name="newsletter-scheduler", daemon=True
+                )
+                self._thread.start()
+
+    def _loop(self, make_client):
+        while True:
+            try:
+                if in_hours(datetime.now().hour, self.off_peak_hours) and self.due():
+                    self.run_due(make_client())
+                self.last_error = None
+            except Exception as e:
+                # Kept for the UI; the next check tries again
+                self.last_error = str(e)
+            time.sleep(config.SCHEDULE_POLL_SECONDS)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Returns the process-wide scheduler, which queues its drafts on the shared job queue."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+        return _scheduler
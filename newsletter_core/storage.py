@@ -0,0 +1,152 @@
+"""Compact on-disk encoding of archived newsletters and insight signatures.
+
+Topics, recommended sources and team names repeat across almost every
+issue, so they are interned once in a ``strings`` table and bodies refer to
+them by id. The rest of a body is compact JSON compressed with zlib, and
+each newsletter is decompressed only when it is loaded.
+"""
+import json
+import sys
+import threading
+import zlib
+from array import array
+
+from .db import connect, ensure_parent_dir
+
+BODY_FORMAT = b"\x01"
+
+# Preset zlib dictionary of the body's structure, which small bodies cannot
+# otherwise reference. Compressed bodies depend on these exact bytes: a
+# different dictionary needs a new BODY_FORMAT.
+ZDICT = (
+    b'{"stages":{"prompts":,"total":},"sections":{"ai":{"input_tokens":,"cache_creation_input_tokens":'
+    b',"cache_read_input_tokens":,"output_tokens":,"ttft_ms":,"call_ms":,"parse_ms":,"calls":}},"tokens":{'
+    b'"team_context":"","team":,"config_name":"","draft":true,"ai_topics":[],"pm_topics":[],"metrics":{'
+    b'{"date":"","timestamp":"","pm_articles":[],"duplicate_of":"","ai_articles":[{"title":"'
+    b'","key_insight":"","why_it_matters":"","action_items":["","",""],"search_terms":["",""],'
+    b'"recommended_sources":[]},{"title":"'
+)
+
+LIST_FIELDS = ("ai_topics", "pm_topics")
+
+
+class StringTable:
+    """Interned strings of an archive database, cached in memory.
+
+    Every loaded newsletter shares the cached ``str`` objects, so repeated
+    topics and sources are held once however many newsletters are open.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._ids = {}
+        self._values = {}
+        self._lock = threading.Lock()
+        ensure_parent_dir(path)
+        with connect(self.path) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS strings (id INTEGER PRIMARY KEY, value TEXT NOT NULL UNIQUE)")
+
+    def _load(self, conn):
+        # Picks up strings added by other instances or processes
+        with self._lock:
+            last_id = max(self._values, default=0)
+        rows = conn.execute("SELECT id, value FROM strings WHERE id > ?", (last_id,)).fetchall()
+        with self._lock:
+            for string_id, value in rows:
+                self._ids[value] = string_id
+                self._values[string_id] = value
+
+    def ids(self, values):
+        """Ids of ``values``, adding any that are new."""
+        with self._lock:
+            missing = [value for value in values if value not in self._ids]
+        if missing:
+            # Committed on its own, so a failed newsletter write leaves at most unused strings behind
+            with connect(self.path) as conn:
+                conn.executemany("INSERT OR IGNORE INTO strings (value) VALUES (?)", [(value,) for value in missing])
+                self._load(conn)
+        with self._lock:
+            return [self._ids[value] for value in values]
+
+    def values(self, ids):
+        with self._lock:
+            missing = any(string_id not in self._values for string_id in ids)
+        if missing:
+            with connect(self.path) as conn:
+                self._load(conn)
+        with self._lock:
+            return [self._values[string_id] for string_id in ids]
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def get_string_table(path):
+    """Returns the process-wide string table of an archive database."""
+    with _tables_lock:
+        if path not in _tables:
+            _tables[path] = StringTable(path)
+        return _tables[path]
+
+
+def encode_topics(topics, strings):
+    # The listing columns keep topics as a JSON list of string ids
+    return json.dumps(strings.ids(topics))
+
+
+def decode_topics(value, strings):
+    return strings.values(json.loads(value))
+
+
+def encode_body(newsletter, strings):
+    """The newsletter without its ``id`` as compressed bytes, with repeated strings interned."""
+    body = {k: v for k, v in newsletter.items() if k != "id"}
+    for field in LIST_FIELDS:
+        if field in body:
+            body[field] = strings.ids(body[field])
+    if body.get("team"):
+        body["team"] = strings.ids([body["team"]])[0]
+    for section in ("ai", "pm"):
+        body[f"{section}_articles"] = [
+            {**article, "recommended_sources": strings.ids(article["recommended_sources"])}
+            if article.get("recommended_sources") else article
+            for article in body.get(f"{section}_articles", [])
+        ]
+
+    compressor = zlib.compressobj(9, zdict=ZDICT)
+    data = json.dumps(body, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return BODY_FORMAT + compressor.compress(data) + compressor.flush()
+
+
+def decode_body(value, strings):
+    """Reverses ``encode_body``."""
+    decompressor = zlib.decompressobj(zdict=ZDICT)
+    body = json.loads(decompressor.decompress(value[len(BODY_FORMAT):]) + decompressor.flush())
+    for field in LIST_FIELDS:
+        if field in body:
+            body[field] = strings.values(body[field])
+    if isinstance(body.get("team"), int):
+        body["team"] = strings.values([body["team"]])[0]
+    for section in ("ai", "pm"):
+        for article in body.get(f"{section}_articles", []):
+            if article.get("recommended_sources"):
+                article["recommended_sources"] = strings.values(article["recommended_sources"])
+    return body
+
+
+def pack_signature(sig):
+    # MinHash values are below 2 ** 61, so each fits in eight little-endian bytes
+    packed = array("Q", sig)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack_signature(value):
+    """A stored signature as an ``array``, about a fifth of the memory of a list of ints."""
+    packed = array("Q")
+    packed.frombytes(value)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed
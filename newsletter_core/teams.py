@@ -0,0 +1,34 @@
+import json
+import re
+from datetime import date
+
+from .prompts import DEFAULT_AI_TOPICS, DEFAULT_PM_TOPICS
+
+
+def team_slug(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "team"
+
+
+def load_teams(path):
+    # Either a JSON list of team configs or {"teams": [...]}
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    teams = data["teams"] if isinstance(data, dict) else data
+    for i, team in enumerate(teams):
+        team.setdefault("name", f"team-{i + 1}")
+    return teams
+
+
+def resolve_team(team, issue_date=None):
+    """Fills in the defaults of a team config; ``date`` becomes an ISO string."""
+    if team.get("date"):
+        issue_date = date.fromisoformat(team["date"])
+    return {
+        "name": team["name"],
+        "date": (issue_date or date.today()).isoformat(),
+        "ai_topics": team.get("ai_topics", DEFAULT_AI_TOPICS),
+        "pm_topics": team.get("pm_topics", DEFAULT_PM_TOPICS),
+        "num_ai": team.get("num_ai", 2),
+        "num_pm": team.get("num_pm", 2),
+        "team_context": team.get("team_context", ""),
+    }
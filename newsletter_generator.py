@@ -1,8 +1,43 @@
 import streamlit as st
-import anthropic
 import os
+import time
 from datetime import datetime
-import json
+
+# Page run time, shown in the Performance panel; the first run also includes the imports below
+script_started = time.perf_counter()
+
+from newsletter_core import (
+    AI_TOPIC_OPTIONS,
+    DEFAULT_AI_TOPICS,
+    DEFAULT_PM_TOPICS,
+    EXPORTERS,
+    MODELS,
+    PM_TOPIC_OPTIONS,
+    NewsletterArchive,
+    ResponseCache,
+    RunMetrics,
+    article_blocks,
+    build_requests,
+    estimate_run,
+    export_newsletter,
+    format_usage,
+    get_client,
+    elapsed_ms,
+    get_job_queue,
+    get_limiter,
+    get_scheduler,
+    newsletter_slug,
+    next_issue_date,
+    regenerate_insight,
+    render_newsletter,
+    route_requests,
+    start_archive_export,
+    summarize,
+    to_json,
+    to_prometheus,
+)
+from newsletter_core.config import ARCHIVE_PAGE_SIZE, ISSUE_INTERVAL_DAYS, JOB_POLL_SECONDS, SECTION_MODELS
+from newsletter_core.jobs import ACTIVE_STATES
 
 # Configuration
 st.set_page_config(
@@ -47,19 +82,112 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# API key setup
-try:
-    api_key = st.secrets["ANTHROPIC_API_KEY"]
-except:
-    from dotenv import load_dotenv
-    load_dotenv()
-    api_key = os.environ.get("ANTHROPIC_API_KEY")
+# API key setup, done once per process instead of on every rerun
+@st.cache_resource
+def load_api_key():
+    try:
+        return st.secrets["ANTHROPIC_API_KEY"]
+    except (FileNotFoundError, KeyError):
+        # No secrets.toml or no key in it: fall back to .env and the environment
+        from dotenv import load_dotenv
+        load_dotenv()
+        return os.environ.get("ANTHROPIC_API_KEY")
+
+
+# Shared by every session; each runs its schema setup only once
+@st.cache_resource
+def load_response_cache():
+    return ResponseCache()
+
+
+@st.cache_resource
+def load_archive():
+    return NewsletterArchive()
+
+
+@st.cache_resource
+def startup_timings():
+    # Filled in by the first page run of the process
+    return {}
+
+
+api_key = load_api_key()
+
+SECTION_LABELS = {
+    "ai": "🤖 AI Insights",
+    "pm": "📊 PM Insights",
+}
+
+PERFORMANCE_PANEL_METRICS = (
+    "total_ms",
+    "prompts_ms",
+    "render_ms",
+    "ai.ttft_ms",
+    "ai.call_ms",
+    "pm.ttft_ms",
+    "pm.call_ms",
+    "tokens.input_tokens",
+    "tokens.cache_read_input_tokens",
+    "tokens.output_tokens",
+)
+
+
+def render_article(blocks, regenerate_key=None):
+    # Returns True when the card's regenerate button was clicked
+    st.markdown(blocks["card"], unsafe_allow_html=True)
+    if blocks["actions"]:
+        st.markdown(blocks["actions"])
+    if blocks["search"]:
+        st.markdown(blocks["search"], unsafe_allow_html=True)
+    clicked = bool(regenerate_key) and st.button("🔄 Regenerate this insight", key=regenerate_key)
+    st.markdown("---")
+    return clicked
+
+
+def regenerate_article(newsletter, section, position, dedup):
+    # Swaps one insight for a new one, in the session and in the archive
+    with st.spinner("🔮 Rewriting this insight..."):
+        try:
+            updated, stats = regenerate_insight(
+                get_client(api_key), newsletter, section, position, dedup=dedup, models=models
+            )
+        except Exception as e:
+            st.error(f"❌ Could not regenerate the insight: {str(e)}")
+            return
+    if "id" in updated and not archive.update(updated):
+        # Deleted from the archive meanwhile (e.g. in another session); the preview offers to save it again
+        updated = {k: v for k, v in updated.items() if k != "id"}
+    st.session_state.generated_newsletter = updated
+    st.session_state.last_edit = f"🔄 Insight replaced in {stats['call_ms'] / 1000:.1f}s ({format_usage(stats)})"
+    st.rerun()
+
 
 # Initialize session state
-if 'newsletters' not in st.session_state:
-    st.session_state.newsletters = []
 if 'generated_newsletter' not in st.session_state:
     st.session_state.generated_newsletter = None
+if 'generation_errors' not in st.session_state:
+    st.session_state.generation_errors = {}
+if 'archive_page' not in st.session_state:
+    st.session_state.archive_page = 0
+if 'job_id' not in st.session_state:
+    # A job started before a reload or reconnect is found again through the URL
+    st.session_state.job_id = st.query_params.get("job")
+
+response_cache = load_response_cache()
+archive = load_archive()
+jobs = get_job_queue()
+scheduler = get_scheduler()
+if api_key:
+    # Drafts the next issue of every saved configuration during off-peak hours
+    scheduler.start(lambda: get_client(api_key))
+
+# A bookmarked ?config=... opens that configuration's latest pre-generated draft right away
+if 'draft_opened' not in st.session_state:
+    st.session_state.draft_opened = True
+    config_name = st.query_params.get("config")
+    drafts = archive.drafts(config_name) if config_name else []
+    if drafts and st.session_state.job_id is None and st.session_state.generated_newsletter is None:
+        st.session_state.generated_newsletter = archive.get(drafts[0]["id"])
 
 # Header
 st.markdown("""
@@ -95,34 +223,16 @@ with st.sidebar:
     with st.expander("🎯 AI Focus Areas", expanded=False):
         ai_topics = st.multiselect(
             "Select topics",
-            [
-                "Generative AI / LLMs",
-                "Multilingual AI",
-                "AI Product Strategy",
-                "AI for E-commerce",
-                "AI Ethics & Responsible AI",
-                "Emerging AI Capabilities",
-                "AI Cost Optimization",
-                "Voice AI & Multimodal"
-            ],
-            default=["Generative AI / LLMs", "Multilingual AI", "AI Product Strategy"],
+            AI_TOPIC_OPTIONS,
+            default=DEFAULT_AI_TOPICS,
             label_visibility="collapsed"
         )
     
     with st.expander("📊 PM Focus Areas", expanded=False):
         pm_topics = st.multiselect(
             "Select topics",
-            [
-                "AI-First Product Management",
-                "Product Strategy",
-                "Stakeholder Management",
-                "Team Leadership",
-                "Data-Driven Decision Making",
-                "Customer Research",
-                "Product Roadmapping",
-                "Cross-functional Collaboration"
-            ],
-            default=["AI-First Product Management", "Product Strategy", "Team Leadership"],
+            PM_TOPIC_OPTIONS,
+            default=DEFAULT_PM_TOPICS,
             label_visibility="collapsed"
         )
     
@@ -137,14 +247,148 @@ with st.sidebar:
     
     st.markdown("---")
     
+    with st.expander("🧠 Models", expanded=False):
+        model_ids = list(dict.fromkeys([*MODELS, *SECTION_MODELS.values()]))
+        models = {
+            key: st.selectbox(
+                f"{SECTION_LABELS[key]} model",
+                model_ids,
+                index=model_ids.index(SECTION_MODELS[key]),
+                format_func=lambda model: MODELS.get(model, {}).get("label", model),
+                key=f"model_{key}"
+            )
+            for key in SECTION_LABELS
+        }
+        draft_refine = st.toggle(
+            "✍️ Draft with a fast model, then refine",
+            help="A fast model writes a first draft that the chosen model then sharpens"
+        )
+    
+    with st.expander("🗓️ Scheduled Drafts", expanded=False):
+        start_hour, end_hour = scheduler.off_peak_hours
+        st.caption(
+            f"Saved configurations get their next issue drafted up to {scheduler.days_ahead} days ahead, "
+            f"between {start_hour}:00 and {end_hour}:00, so it is ready when you open the app."
+        )
+        schedule_name = st.text_input("Configuration name", placeholder="e.g. Languages team", key="schedule_name")
+        interval_days = st.number_input("Issue every (days)", 1, 90, ISSUE_INTERVAL_DAYS, key="schedule_interval")
+        if st.button("💾 Save current settings", disabled=not schedule_name.strip(), use_container_width=True):
+            saved = scheduler.save({
+                "name": schedule_name.strip(),
+                "ai_topics": ai_topics,
+                "pm_topics": pm_topics,
+                "num_ai": num_ai,
+                "num_pm": num_pm,
+                "team_context": team_context,
+                "models": models,
+                "draft_refine": draft_refine,
+                "first_date": issue_date.isoformat(),
+                "interval_days": int(interval_days),
+            })
+            # Bookmarking the page now opens this configuration's draft
+            st.query_params["config"] = saved["name"]
+            st.success(f"Saved. The {next_issue_date(saved):%B %d} issue will be drafted ahead of time.")
+        
+        for saved in scheduler.configs():
+            next_issue = next_issue_date(saved)
+            if archive.has_issue(saved["name"], next_issue.isoformat()):
+                status = "📝 ready"
+            elif scheduler.gave_up(saved["name"], next_issue):
+                status = "❌ failed, save it again to retry"
+            else:
+                status = "⏳ pending"
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                st.caption(f"**{saved['name']}** · {next_issue:%b %d} · {status}")
+            with col2:
+                if st.button("🗑️", key=f"delete_config_{saved['name']}", help="Stop drafting this configuration"):
+                    scheduler.delete(saved["name"])
+                    st.rerun()
+        if api_key and scheduler.due() and st.button("⚡ Draft due issues now", use_container_width=True):
+            scheduler.run_due(get_client(api_key))
+            st.toast("Drafts queued")
+        if scheduler.last_error:
+            st.caption(f"⚠️ Last scheduled run failed: {scheduler.last_error}")
+    
+    stream_mode = st.toggle(
+        "⚡ Stream insights as they arrive",
+        value=True,
+        help="Show each insight as soon as it is written instead of waiting for the whole newsletter"
+    )
+    
+    avoid_repeats = st.toggle(
+        "🧬 Avoid repeating recent insights",
+        value=True,
+        help="Tells the model which insights recent issues covered and regenerates any that come back too similar. "
+             "Because the list changes with every new issue, cached responses are rarely reused while this is on."
+    )
+    
+    force_refresh = st.checkbox(
+        "🔁 Force refresh",
+        help="Skip the response cache and request fresh insights"
+    )
+    cache_stats = response_cache.stats()
+    st.caption(f"⚡ Cache: {cache_stats['hits']} hits · {cache_stats['misses']} misses · {cache_stats['entries']} stored")
+    api_stats = get_limiter().stats()
+    st.caption(f"🚦 API: {api_stats['in_flight']} in flight · {api_stats['waiting']} queued · {api_stats['retries']} retries")
+    job_counts = jobs.counts()
+    st.caption(f"🧵 Jobs: {job_counts['running']} running · {job_counts['queued']} queued")
+    
+    with st.expander("⏱️ Performance", expanded=False):
+        recent_runs = archive.recent_metrics(limit=50)
+        if recent_runs:
+            performance = summarize(recent_runs)
+            st.caption(f"Last {len(recent_runs)} generations")
+            st.table({
+                name: {"p50": stats["p50"], "p95": stats["p95"]}
+                for name, stats in performance.items()
+                if name in PERFORMANCE_PANEL_METRICS
+            })
+            st.download_button("📈 JSON", to_json(performance), "newsletter_metrics.json", mime="application/json")
+            st.download_button("📈 Prometheus", to_prometheus(performance), "newsletter_metrics.prom", mime="text/plain")
+        else:
+            st.caption("No generations recorded yet")
+        page_timing = st.empty()
+    
+    # Right-sized max_tokens and the chosen models, priced before anything is sent
+    run_estimate = estimate_run(
+        route_requests(
+            build_requests(ai_topics, pm_topics, num_ai, num_pm, team_context),
+            {"ai": num_ai, "pm": num_pm},
+            models,
+            draft_refine,
+        ),
+        {"ai": num_ai, "pm": num_pm},
+    )
+    st.caption(f"💰 Estimated ≈ ${run_estimate['cost_usd']:.3f} · ~{run_estimate['seconds']:.0f}s")
+    
     generate_button = st.button(
         "🚀 Generate Newsletter",
         type="primary",
         use_container_width=True
     )
 
+# Generation runs as a background job, so reruns and reconnects don't abort it
+if generate_button:
+    st.session_state.job_id = jobs.submit(get_client(api_key), {
+        "date": issue_date.isoformat(),
+        "ai_topics": ai_topics,
+        "pm_topics": pm_topics,
+        "num_ai": num_ai,
+        "num_pm": num_pm,
+        "team_context": team_context,
+        "force_refresh": force_refresh,
+        "stream": stream_mode,
+        "avoid_repeats": avoid_repeats,
+        "models": models,
+        "draft_refine": draft_refine,
+    })
+    st.query_params["job"] = st.session_state.job_id
+    st.session_state.generated_newsletter = None
+    st.session_state.generation_errors = {}
+
 # Welcome screen
-if not generate_button and st.session_state.generated_newsletter is None:
+if st.session_state.job_id is None and st.session_state.generated_newsletter is None:
     col1, col2, col3 = st.columns([1, 2, 1])
     
     with col2:
@@ -163,141 +407,102 @@ if not generate_button and st.session_state.generated_newsletter is None:
         """)
         
         st.info("💡 **Note:** Each insight includes search suggestions to help you find the latest articles on these topics.")
+        
+        for draft in archive.drafts():
+            if st.button(f"📝 Open the {draft['config_name']} draft for {draft['date']}",
+                         key=f"open_draft_{draft['id']}", use_container_width=True):
+                st.session_state.generated_newsletter = archive.get(draft["id"])
+                st.query_params["config"] = draft["config_name"]
+                st.rerun()
+        
+        archived_count = archive.count()
+        if archived_count and st.button(f"📚 Browse {archived_count} archived newsletters", use_container_width=True):
+            latest = archive.list(page_size=1)[0]
+            st.session_state.generated_newsletter = archive.get(latest["id"])
+            st.session_state.show_archive = True
+            st.rerun()
 
-# Handle newsletter generation
-if generate_button:
-    with st.spinner("🔮 Generating insights... This takes about 30 seconds."):
-        try:
-            client = anthropic.Anthropic(api_key=api_key)
-            
-            # Get current date for context
-            current_date = datetime.now().strftime("%B %Y")
-            
-            # AI Insights prompt - focused on current trends without fake URLs
-            ai_prompt = f"""You are an expert AI analyst curating in-depth insights for product managers as of {current_date}.
-
-Generate {num_ai} comprehensive AI INSIGHTS about: {', '.join(ai_topics)}
-
-Team context: {team_context if team_context else 'Building AI products at scale'}
-
-For each insight, provide:
-1. **title**: A compelling, specific insight title
-2. **key_insight**: A DETAILED explanation (5-7 sentences) covering:
-   - What the trend/development is
-   - Key technical details or capabilities
-   - How leading companies are approaching this
-   - Specific metrics, benchmarks, or data points where relevant
-   - Practical implementation considerations
-3. **why_it_matters**: 2-3 sentences on strategic implications for AI product teams
-4. **action_items**: 2-3 specific actions product managers should consider
-5. **search_terms**: 2-3 specific search terms for deeper research
-6. **recommended_sources**: 2-3 publications to explore further
-
-Focus on:
-- Developments and trends that are CURRENT and ONGOING
-- Strategic implications with specific examples
-- Practical considerations with concrete details
-- Real companies and products (OpenAI, Anthropic, Google, Meta, etc.)
-- Include specific numbers, benchmarks, or comparisons where possible
-
-Return ONLY valid JSON array (no markdown):
-[
-  {{
-    "title": "...",
-    "key_insight": "...",
-    "why_it_matters": "...",
-    "action_items": ["action1", "action2"],
-    "search_terms": ["term1", "term2"],
-    "recommended_sources": ["Source1", "Source2"]
-  }}
-]"""
-
-            ai_response = client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=4000,
-                messages=[{"role": "user", "content": ai_prompt}]
-            )
-            
-            ai_text = ai_response.content[0].text
-            if "```json" in ai_text:
-                ai_text = ai_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in ai_text:
-                ai_text = ai_text.split("```")[1].split("```")[0].strip()
-            ai_articles = json.loads(ai_text)
-            
-            # PM Insights prompt - timeless frameworks and wisdom
-            pm_prompt = f"""You are an expert curator of product management insights for senior PMs.
-
-Generate {num_pm} comprehensive PM INSIGHTS about: {', '.join(pm_topics)}
-
-For each insight, provide:
-1. **title**: A compelling insight title about a framework, principle, or best practice
-2. **key_insight**: A DETAILED explanation (5-7 sentences) covering:
-   - What the framework/concept is and its origin
-   - Step-by-step how to apply it in practice
-   - Common pitfalls to avoid
-   - Examples of companies or PMs who use this effectively
-   - How it applies specifically to AI products
-3. **why_it_matters**: 2-3 sentences on relevance to modern AI-first product management
-4. **action_items**: 2-3 specific actions product managers can take this week
-5. **search_terms**: 2-3 specific search terms for deeper learning
-6. **recommended_sources**: 2-3 publications to explore further
-
-Focus on:
-- TIMELESS frameworks and mental models with practical depth
-- Step-by-step application guidance
-- Insights from respected PM thought leaders (Lenny Rachitsky, Marty Cagan, Shreyas Doshi, etc.)
-- Specific examples and case studies
-- AI-first product management considerations
-
-Return ONLY valid JSON array (no markdown):
-[
-  {{
-    "title": "...",
-    "key_insight": "...",
-    "why_it_matters": "...",
-    "action_items": ["action1", "action2"],
-    "search_terms": ["term1", "term2"],
-    "recommended_sources": ["Source1", "Source2"]
-  }}
-]"""
-
-            pm_response = client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=4000,
-                messages=[{"role": "user", "content": pm_prompt}]
-            )
-            
-            pm_text = pm_response.content[0].text
-            if "```json" in pm_text:
-                pm_text = pm_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in pm_text:
-                pm_text = pm_text.split("```")[1].split("```")[0].strip()
-            pm_articles = json.loads(pm_text)
-            
-            # Create newsletter object
-            newsletter = {
-                "date": issue_date.strftime("%B %d, %Y"),
-                "timestamp": datetime.now().isoformat(),
-                "ai_articles": ai_articles,
-                "pm_articles": pm_articles,
-                "ai_topics": ai_topics,
-                "pm_topics": pm_topics
-            }
-            
-            st.session_state.newsletters.insert(0, newsletter)
-            st.session_state.generated_newsletter = newsletter
-            
+# Show a background generation job until it finishes
+job_active = False
+if st.session_state.job_id:
+    job = jobs.get(st.session_state.job_id)
+    if job is not None and job["status"] in ACTIVE_STATES:
+        job_active = True
+        st.info("🔮 Generating insights in the background... This takes about 15 seconds. "
+                "You can keep using the app meanwhile.")
+        for key, col in zip(SECTION_LABELS, st.columns(2)):
+            with col:
+                st.markdown(f'<h2 class="section-header">{SECTION_LABELS[key]}</h2>', unsafe_allow_html=True)
+                section = job["progress"][key]
+                if section["status"] == "error":
+                    st.error(f"❌ {SECTION_LABELS[key]} failed: {section['error']}")
+                elif section["status"] in ("done", "cached"):
+                    source = "loaded from cache" if section["status"] == "cached" else "ready"
+                    st.success(f"✅ {section['articles']} insights {source}")
+                else:
+                    st.info("⏳ Writing insights...")
+                for i, article in enumerate(job["articles"].get(key, []), 1):
+                    render_article(article_blocks(i, article, key))
+    else:
+        if job is not None and job["status"] == "done":
+            st.session_state.generated_newsletter = archive.get(job["newsletter_id"])
+            st.session_state.generation_errors = job["errors"]
+            # Its first preview is timed and added to the run's metrics
+            st.session_state.unrendered_run = job["newsletter_id"]
             st.success("✅ Newsletter generated successfully!")
-            st.rerun()
-            
-        except Exception as e:
-            st.error(f"❌ Error generating newsletter: {str(e)}")
+        elif job is not None:
+            st.error(f"❌ Error generating newsletter: {job['error']}.")
+            # Each section's own error (auth, overload, ...) says more than the summary
+            for key, error in job["errors"].items():
+                st.error(f"❌ {SECTION_LABELS[key]} failed: {error}")
             st.info("Please check your API key and try again.")
+        st.session_state.job_id = None
+        st.query_params.pop("job", None)
 
 # Display generated newsletter
 if st.session_state.generated_newsletter:
     newsletter = st.session_state.generated_newsletter
+    render_metrics = RunMetrics()
+    # Email text, JSON and preview markup are built once per newsletter, not on every rerun
+    with render_metrics.stage("render"):
+        formatted = render_newsletter(newsletter)
+    
+    for key, error in st.session_state.generation_errors.items():
+        st.warning(f"⚠️ {SECTION_LABELS[key]} could not be generated ({error}). The rest of the newsletter was kept.")
+    if 'last_edit' in st.session_state:
+        st.caption(st.session_state.pop('last_edit'))
+    if "id" not in newsletter:
+        st.warning("⚠️ This newsletter was deleted from the archive, so your changes were not saved.")
+        if st.button("💾 Save as new", key="save_as_new"):
+            # Its run was already recorded with the deleted copy, so the metrics are not stored twice
+            newsletter.pop("metrics", None)
+            archive.add(newsletter)
+            st.rerun()
+    
+    if newsletter.get("draft"):
+        st.info(f"📝 Pre-generated draft for **{newsletter['config_name']}**. "
+                "Refresh it for the latest insights, or publish it to the archive.")
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("🔄 Refresh draft", use_container_width=True,
+                         disabled=not api_key or scheduler.get(newsletter["config_name"]) is None):
+                try:
+                    st.session_state.job_id = scheduler.refresh(
+                        get_client(api_key),
+                        newsletter["config_name"],
+                        datetime.strptime(newsletter["date"], "%B %d, %Y").date(),
+                    )
+                except ValueError as e:
+                    # Deleted in another session since this page was drawn
+                    st.error(f"❌ Could not refresh the draft: {str(e)}")
+                else:
+                    st.query_params["job"] = st.session_state.job_id
+                    st.session_state.generated_newsletter = None
+                    st.rerun()
+        with col2:
+            if st.button("✅ Publish", use_container_width=True):
+                st.session_state.generated_newsletter = archive.publish(newsletter["id"])
+                st.rerun()
     
     # Action buttons
     col1, col2, col3, col4 = st.columns([2, 2, 2, 1])
@@ -310,12 +515,13 @@ if st.session_state.generated_newsletter:
     with col3:
         if st.button("🔄 Generate New", use_container_width=True):
             st.session_state.generated_newsletter = None
+            st.session_state.generation_errors = {}
             st.rerun()
     with col4:
         st.download_button(
             "💾",
-            json.dumps(newsletter, indent=2),
-            f"newsletter_{newsletter['date'].replace(' ', '_').replace(',', '')}.json",
+            formatted["json"],
+            f"newsletter_{newsletter_slug(newsletter)}.json",
             mime="application/json",
             use_container_width=True
         )
@@ -326,79 +532,7 @@ if st.session_state.generated_newsletter:
     if st.session_state.get('show_email', False):
         st.markdown("## 📧 Email Format")
         
-        email_content = f"""Subject: Bi-Weekly Insights: AI & Product Management | {newsletter['date']}
-
-Hi team,
-
-Here are this week's curated insights on AI trends and product management excellence.
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-🤖 AI INSIGHTS
-
-"""
-        for i, article in enumerate(newsletter['ai_articles'], 1):
-            search_terms = article.get('search_terms', [])
-            sources = article.get('recommended_sources', [])
-            action_items = article.get('action_items', [])
-            
-            email_content += f"""{i}. {article['title']}
-
-{article['key_insight']}
-
-💡 Why it matters: {article['why_it_matters']}
-
-"""
-            if action_items:
-                email_content += "🎯 Action Items:\n"
-                for action in action_items:
-                    email_content += f"   • {action}\n"
-                email_content += "\n"
-            
-            email_content += f"""🔍 Learn more: {', '.join(search_terms) if search_terms else 'N/A'}
-📚 Sources: {', '.join(sources) if sources else 'N/A'}
-
-"""
-        
-        email_content += """━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-📊 PRODUCT MANAGEMENT INSIGHTS
-
-"""
-        for i, article in enumerate(newsletter['pm_articles'], 1):
-            search_terms = article.get('search_terms', [])
-            sources = article.get('recommended_sources', [])
-            action_items = article.get('action_items', [])
-            
-            email_content += f"""{i}. {article['title']}
-
-{article['key_insight']}
-
-💡 Why it matters: {article['why_it_matters']}
-
-"""
-            if action_items:
-                email_content += "🎯 Action Items:\n"
-                for action in action_items:
-                    email_content += f"   • {action}\n"
-                email_content += "\n"
-            
-            email_content += f"""🔍 Learn more: {', '.join(search_terms) if search_terms else 'N/A'}
-📚 Sources: {', '.join(sources) if sources else 'N/A'}
-
-"""
-        
-        email_content += """━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-💡 SHARE YOUR INSIGHTS
-
-Have insights to share? Reply to this email or post in our team channel.
-
-Happy reading!
-
-Best,
-Udit
-Head of Product, North America Languages Experience"""
+        email_content = formatted["email"]
         
         st.text_area(
             "📋 Copy this text into your email:",
@@ -409,11 +543,31 @@ Head of Product, North America Languages Experience"""
         st.download_button(
             "💾 Download Email Text",
             email_content,
-            f"newsletter_email_{newsletter['date'].replace(' ', '_').replace(',', '')}.txt",
+            f"newsletter_email_{newsletter_slug(newsletter)}.txt",
             mime="text/plain",
             use_container_width=True
         )
         
+        # Other formats are only rendered for the one that is selected
+        export_col1, export_col2 = st.columns([2, 1])
+        with export_col1:
+            export_format = st.selectbox(
+                "Export as",
+                list(EXPORTERS),
+                format_func=lambda name: EXPORTERS[name].label,
+                key="export_format"
+            )
+        with export_col2:
+            export_content, export_filename, export_mime = export_newsletter(newsletter, export_format)
+            st.markdown("")
+            st.download_button(
+                f"💾 Download {EXPORTERS[export_format].label}",
+                export_content,
+                export_filename,
+                mime=export_mime,
+                use_container_width=True
+            )
+        
         if st.button("⬅️ Back to Preview", use_container_width=True):
             st.session_state.show_email = False
             st.rerun()
@@ -421,41 +575,148 @@ Head of Product, North America Languages Experience"""
     # Show archive
     elif st.session_state.get('show_archive', False):
         st.markdown("## 📚 Newsletter Archive")
-        st.markdown(f"*{len(st.session_state.newsletters)} newsletters generated*")
-        st.markdown("---")
         
-        for idx, past_newsletter in enumerate(st.session_state.newsletters):
+        def reset_archive_page():
+            st.session_state.archive_page = 0
+        
+        search_query = st.text_input(
+            "🔎 Search insights",
+            placeholder="e.g. cost optimization",
+            key="archive_search",
+            on_change=reset_archive_page
+        )
+        filter_col1, filter_col2 = st.columns(2)
+        with filter_col1:
+            topic_options = ["All topics"] + archive.topics()
+            topic_choice = st.selectbox("Filter by topic", topic_options, key="archive_topic", on_change=reset_archive_page)
+            topic_filter = None if topic_choice == "All topics" else topic_choice
+        with filter_col2:
+            date_range = st.date_input("Issue dates", value=(), key="archive_dates", on_change=reset_archive_page)
+        filters = {
+            "topic": topic_filter,
+            "date_from": date_range[0].isoformat() if len(date_range) > 0 else None,
+            "date_to": date_range[1].isoformat() if len(date_range) > 1 else None,
+        }
+        
+        if search_query.strip():
+            # Ranked insight matches from the full-text index instead of the issue list
+            page = st.session_state.archive_page
+            total, results = archive.search(search_query, page=page, page_size=ARCHIVE_PAGE_SIZE, **filters)
+            page_count = max(1, -(-total // ARCHIVE_PAGE_SIZE))
+            if page >= page_count:
+                page = page_count - 1
+                total, results = archive.search(search_query, page=page, page_size=ARCHIVE_PAGE_SIZE, **filters)
+            st.markdown(f"*{total} matching insights*")
+            st.markdown("---")
+            
+            for result in results:
+                st.markdown(f"**{result['title']}**")
+                st.caption(f"{result['date']} · {SECTION_LABELS[result['section']]}")
+                st.markdown(result['snippet'])
+                if st.button("📰 Open issue", key=f"result_{result['newsletter_id']}_{result['section']}_{result['position']}"):
+                    st.session_state.generated_newsletter = archive.get(result['newsletter_id'])
+                    st.session_state.generation_errors = {}
+                    st.session_state.show_archive = False
+                    st.rerun()
+                st.markdown("---")
+            summaries = []
+        else:
+            total = archive.count(**filters)
+            page_count = max(1, -(-total // ARCHIVE_PAGE_SIZE))
+            page = min(st.session_state.archive_page, page_count - 1)
+            st.markdown(f"*{total} newsletters generated*")
+            st.markdown("---")
+            summaries = archive.list(page=page, page_size=ARCHIVE_PAGE_SIZE, **filters)
+        
+        # Only summaries are listed; article bodies are loaded when an issue is opened
+        for idx, summary in enumerate(summaries):
             with st.expander(
-                f"📰 {past_newsletter['date']}",
-                expanded=(idx == 0)
+                f"📰 {summary['date']} · {summary['ai_count']} AI / {summary['pm_count']} PM insights",
+                expanded=(page == 0 and idx == 0)
             ):
-                st.markdown(f"*Generated: {datetime.fromisoformat(past_newsletter['timestamp']).strftime('%B %d, %Y at %I:%M %p')}*")
-                
-                col1, col2 = st.columns(2)
+                st.markdown(f"*Generated: {datetime.fromisoformat(summary['timestamp']).strftime('%B %d, %Y at %I:%M %p')}*")
+                st.caption(" · ".join(summary['ai_topics'] + summary['pm_topics']))
                 
-                with col1:
-                    st.markdown("### 🤖 AI Insights")
-                    for i, article in enumerate(past_newsletter['ai_articles'], 1):
-                        st.markdown(f"**{i}. {article['title']}**")
-                        st.caption(article.get('key_insight', article.get('tldr', '')))
-                        st.markdown("")
+                if st.toggle("Show insights", value=(page == 0 and idx == 0), key=f"open_{summary['id']}"):
+                    past_newsletter = archive.get(summary['id'])
+                    col1, col2 = st.columns(2)
+                    
+                    with col1:
+                        st.markdown("### 🤖 AI Insights")
+                        for i, article in enumerate(past_newsletter['ai_articles'], 1):
+                            st.markdown(f"**{i}. {article['title']}**")
+                            st.caption(article.get('key_insight', article.get('tldr', '')))
+                            st.markdown("")
+                    
+                    with col2:
+                        st.markdown("### 📊 PM Insights")
+                        for i, article in enumerate(past_newsletter['pm_articles'], 1):
+                            st.markdown(f"**{i}. {article['title']}**")
+                            st.caption(article.get('key_insight', article.get('tldr', '')))
+                            st.markdown("")
                 
-                with col2:
-                    st.markdown("### 📊 PM Insights")
-                    for i, article in enumerate(past_newsletter['pm_articles'], 1):
-                        st.markdown(f"**{i}. {article['title']}**")
-                        st.caption(article.get('key_insight', article.get('tldr', '')))
-                        st.markdown("")
-                
-                if st.button("🗑️ Delete", key=f"delete_{idx}"):
-                    st.session_state.newsletters.pop(idx)
-                    if len(st.session_state.newsletters) == 0:
+                if st.button("🗑️ Delete", key=f"delete_{summary['id']}"):
+                    archive.delete(summary['id'])
+                    if archive.count() == 0:
                         st.session_state.generated_newsletter = None
                         st.session_state.show_archive = False
                     st.rerun()
         
+        if page_count > 1:
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col1:
+                if st.button("⬅️ Newer", disabled=(page == 0), use_container_width=True):
+                    st.session_state.archive_page = page - 1
+                    st.rerun()
+            with col2:
+                st.markdown(f"<p style='text-align: center;'>Page {page + 1} of {page_count}</p>", unsafe_allow_html=True)
+            with col3:
+                if st.button("Older ➡️", disabled=(page >= page_count - 1), use_container_width=True):
+                    st.session_state.archive_page = page + 1
+                    st.rerun()
+        
+        # Whole-archive export runs on a background thread and streams to a file
+        with st.expander("📦 Export whole archive"):
+            export_kind = st.radio(
+                "Format",
+                ["zip", "ndjson"],
+                format_func=lambda kind: {"zip": "Zip (HTML, Markdown, text and JSON per newsletter)",
+                                          "ndjson": "NDJSON (one newsletter per line)"}[kind],
+                key="archive_export_kind"
+            )
+            export_job = st.session_state.get("archive_export")
+            if export_job is None or export_job["future"].done():
+                if st.button("📦 Start export", use_container_width=True):
+                    future, path, progress = start_archive_export(archive, export_kind)
+                    st.session_state.archive_export = {"future": future, "path": path, "progress": progress}
+                    st.rerun()
+            
+            if export_job is not None:
+                future = export_job["future"]
+                if not future.done():
+                    progress = export_job["progress"]
+                    st.info(f"⏳ Exporting… {progress['done']} of {progress['total']} newsletters written")
+                    if st.button("🔄 Refresh", key="archive_export_refresh"):
+                        st.rerun()
+                elif future.exception() is not None:
+                    st.error(f"❌ Export failed: {future.exception()}")
+                else:
+                    st.success(f"✅ {future.result()} newsletters exported to `{export_job['path']}`")
+                    # The file is only read into the page for the run that asks for it, not on every rerun
+                    if st.button("📥 Prepare download", key="archive_export_prepare", use_container_width=True):
+                        export_path = export_job["path"]
+                        with open(export_path, "rb") as f:
+                            st.download_button(
+                                "💾 Download export",
+                                f,
+                                os.path.basename(export_path),
+                                mime="application/zip" if export_path.endswith(".zip") else "application/x-ndjson",
+                                use_container_width=True
+                            )
+        
         if st.button("⬅️ Back to Current", use_container_width=True):
             st.session_state.show_archive = False
+            st.session_state.archive_page = 0
             st.rerun()
     
     # Default: Preview
@@ -464,73 +725,30 @@ Head of Product, North America Languages Experience"""
         st.markdown("*Curated insights with search suggestions to find the latest articles*")
         st.markdown("")
         
-        col1, col2 = st.columns(2)
+        with render_metrics.stage("render"):
+            col1, col2 = st.columns(2)
         
-        with col1:
-            st.markdown('<h2 class="section-header">🤖 AI Insights</h2>', unsafe_allow_html=True)
-            st.markdown("*Current trends and strategic considerations*")
-            st.markdown("")
+            with col1:
+                st.markdown('<h2 class="section-header">🤖 AI Insights</h2>', unsafe_allow_html=True)
+                st.markdown("*Current trends and strategic considerations*")
+                st.markdown("")
             
-            for i, article in enumerate(newsletter['ai_articles'], 1):
-                search_terms = article.get('search_terms', [])
-                sources = article.get('recommended_sources', [])
-                action_items = article.get('action_items', [])
-                
-                st.markdown(f"""
-                <div class="article-card">
-                    <h3>{i}. {article['title']}</h3>
-                    <p style="line-height: 1.7;">{article.get('key_insight', article.get('tldr', ''))}</p>
-                    <p style="color: #667eea; margin-top: 1rem;"><strong>💡 Why it matters:</strong> {article.get('why_it_matters', '')}</p>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                if action_items:
-                    st.markdown("**🎯 Action Items:**")
-                    for action in action_items:
-                        st.markdown(f"• {action}")
-                
-                if search_terms:
-                    search_links = " | ".join([f'<a href="https://www.google.com/search?q={term.replace(" ", "+")}" target="_blank">{term}</a>' for term in search_terms])
-                    st.markdown(f"""
-                    <div class="search-tip">
-                        🔍 <strong>Learn more:</strong> {search_links}<br>
-                        📚 <strong>Sources:</strong> {', '.join(sources) if sources else 'TechCrunch, The Verge, VentureBeat'}
-                    </div>
-                    """, unsafe_allow_html=True)
-                st.markdown("---")
+                for position, blocks in enumerate(formatted["preview"]["ai"]):
+                    if render_article(blocks, regenerate_key=f"regenerate_ai_{position}"):
+                        regenerate_article(newsletter, "ai", position, archive.insights if avoid_repeats else None)
         
-        with col2:
-            st.markdown('<h2 class="section-header">📊 PM Insights</h2>', unsafe_allow_html=True)
-            st.markdown("*Timeless wisdom for product leaders*")
-            st.markdown("")
+            with col2:
+                st.markdown('<h2 class="section-header">📊 PM Insights</h2>', unsafe_allow_html=True)
+                st.markdown("*Timeless wisdom for product leaders*")
+                st.markdown("")
             
-            for i, article in enumerate(newsletter['pm_articles'], 1):
-                search_terms = article.get('search_terms', [])
-                sources = article.get('recommended_sources', [])
-                action_items = article.get('action_items', [])
-                
-                st.markdown(f"""
-                <div class="article-card">
-                    <h3>{i}. {article['title']}</h3>
-                    <p style="line-height: 1.7;">{article.get('key_insight', article.get('tldr', ''))}</p>
-                    <p style="color: #667eea; margin-top: 1rem;"><strong>💡 Why it matters:</strong> {article.get('why_it_matters', '')}</p>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                if action_items:
-                    st.markdown("**🎯 Action Items:**")
-                    for action in action_items:
-                        st.markdown(f"• {action}")
-                
-                if search_terms:
-                    search_links = " | ".join([f'<a href="https://www.google.com/search?q={term.replace(" ", "+")}" target="_blank">{term}</a>' for term in search_terms])
-                    st.markdown(f"""
-                    <div class="search-tip">
-                        🔍 <strong>Learn more:</strong> {search_links}<br>
-                        📚 <strong>Sources:</strong> {', '.join(sources) if sources else "Lenny's Newsletter, First Round Review"}
-                    </div>
-                    """, unsafe_allow_html=True)
-                st.markdown("---")
+                for position, blocks in enumerate(formatted["preview"]["pm"]):
+                    if render_article(blocks, regenerate_key=f"regenerate_pm_{position}"):
+                        regenerate_article(newsletter, "pm", position, archive.insights if avoid_repeats else None)
+        
+        if newsletter.get("id") is not None and st.session_state.get("unrendered_run") == newsletter["id"]:
+            archive.record_stages(newsletter["id"], render_metrics.stages)
+            st.session_state.unrendered_run = None
 
 # Footer
 st.markdown("---")
@@ -540,3 +758,12 @@ st.markdown("""
     <p style="font-size: 0.9rem;">Part of the AI-First PM Study Plan</p>
 </div>
 """, unsafe_allow_html=True)
+
+page_run_ms = elapsed_ms(script_started)
+cold_start_ms = startup_timings().setdefault("cold_start_ms", page_run_ms)
+page_timing.caption(f"🕒 Page run: {page_run_ms:.0f} ms · cold start: {cold_start_ms:.0f} ms")
+
+# Poll the background job; any widget interaction simply starts the next rerun sooner
+if job_active:
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
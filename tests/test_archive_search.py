@@ -0,0 +1,90 @@
+import pytest
+
+from newsletter_core.archive import NewsletterArchive, match_query
+
+
+def make_newsletter(title, key_insight, date="May 01, 2025", draft=False):
+    newsletter = {
+        "date": date,
+        "timestamp": "2025-05-01T09:00:00",
+        "ai_topics": ["Multilingual AI"],
+        "pm_topics": ["Product Strategy"],
+        "team_context": "",
+        "ai_articles": [
+            {
+                "title": title,
+                "key_insight": key_insight,
+                "why_it_matters": "It changes the roadmap.",
+                "action_items": ["Run a pilot"],
+                "search_terms": ["pilot"],
+                "recommended_sources": [],
+            }
+        ],
+        "pm_articles": [],
+    }
+    if draft:
+        newsletter.update(config_name="Languages", draft=True)
+    return newsletter
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = NewsletterArchive(str(tmp_path / "archive.db"))
+    archive.add(make_newsletter("Speech models go multilingual", "One model now covers forty languages."))
+    archive.add(make_newsletter("Pricing experiments", "NOT every price test needs a control.", date="June 01, 2025"))
+    return archive
+
+
+def test_match_query_quotes_every_word_as_a_prefix():
+    assert match_query("Speech MODELS") == '"speech"* "models"*'
+
+
+@pytest.mark.parametrize("text", ['"', "NOT", "a OR b", "title:x", "(unbalanced", "near*", "x AND", "^start", "-"])
+def test_fts_syntax_in_user_input_is_literal(archive, text):
+    # Must never raise an FTS5 syntax error
+    total, results = archive.search(text)
+    assert total == len(results)
+
+
+def test_operator_words_match_as_plain_words(archive):
+    total, results = archive.search("not every")
+
+    assert total == 1
+    assert results[0]["title"] == "Pricing experiments"
+
+
+def test_prefix_match_and_snippet(archive):
+    total, results = archive.search("fort")
+
+    assert total == 1
+    assert results[0]["title"] == "Speech models go multilingual"
+    assert results[0]["section"] == "ai" and results[0]["position"] == 0
+    assert "**forty**" in results[0]["snippet"]
+
+
+def test_empty_query_returns_nothing(archive):
+    assert archive.search("  ?! ") == (0, [])
+
+
+def test_date_filter(archive):
+    assert archive.search("pilot", date_from="2025-06-01")[0] == 1
+    assert archive.search("pilot", date_to="2025-05-31")[0] == 1
+    assert archive.search("pilot")[0] == 2
+
+
+def test_drafts_are_not_searched(archive):
+    archive.add(make_newsletter("Speech drafts stay private", "Not published yet.", draft=True))
+
+    assert archive.search("speech")[0] == 1
+    assert archive.count() == 2
+    assert len(list(archive.iter_newsletters())) == 2
+
+
+def test_update_of_a_deleted_newsletter_changes_nothing(archive):
+    newsletter = archive.get(archive.list()[0]["id"])
+    archive.delete(newsletter["id"])
+    newsletter["ai_articles"][0]["title"] = "Speech models revisited"
+
+    assert archive.update(newsletter) is False
+    assert archive.search("revisited") == (0, [])
+    assert not archive.insights.find_duplicates(newsletter["ai_articles"][0])
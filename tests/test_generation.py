@@ -0,0 +1,55 @@
+import json
+
+import anthropic
+import pytest
+
+from newsletter_core.fake_api import FakeAnthropicServer
+from newsletter_core.generation import generate_section, stream_section
+
+
+def insight(title):
+    return {"title": title, "key_insight": f"{title} insight", "why_it_matters": f"{title} matters"}
+
+
+@pytest.fixture
+def client():
+    # Every reply has five insights, however many were asked for
+    text = json.dumps([insight(f"Insight {i}") for i in range(5)])
+    with FakeAnthropicServer(responder=lambda params: text) as server:
+        yield anthropic.Anthropic(api_key="test", base_url=server.base_url, max_retries=0)
+
+
+REQUEST = {"max_tokens": 1000, "messages": [{"role": "user", "content": "Generate 3 insights"}]}
+
+
+@pytest.mark.parametrize("worker", [generate_section, stream_section])
+def test_section_is_capped_at_the_requested_count(client, worker):
+    reported = []
+
+    articles, stats = worker(client, REQUEST, reported.append, count=3)
+
+    assert [article["title"] for article in articles] == ["Insight 0", "Insight 1", "Insight 2"]
+    assert reported == (articles if worker is stream_section else [])
+    assert stats["calls"] == 1
+
+
+def test_without_a_count_every_insight_is_kept(client):
+    articles, _ = generate_section(client, REQUEST)
+
+    assert len(articles) == 5
+
+
+def test_repair_after_a_cut_off_tops_up_to_the_count():
+    complete = json.dumps([insight(f"Insight {i}") for i in range(5)])
+    cut = complete[:complete.index('{"title": "Insight 2"')]
+
+    def responder(params):
+        # The first reply stops after two insights, the repair turn writes five more
+        return cut if len(params["messages"]) == 1 else json.dumps([insight(f"Extra {i}") for i in range(5)])
+
+    with FakeAnthropicServer(responder=responder) as server:
+        client = anthropic.Anthropic(api_key="test", base_url=server.base_url, max_retries=0)
+        articles, stats = generate_section(client, REQUEST, count=3)
+
+    assert [article["title"] for article in articles] == ["Insight 0", "Insight 1", "Extra 0"]
+    assert stats["calls"] == 2
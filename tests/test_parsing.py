@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from newsletter_core.parsing import InsightStreamParser, parse_insights
+
+
+def insight(title):
+    return {"title": title, "key_insight": f"{title} insight", "why_it_matters": f"{title} matters"}
+
+
+def response(*items):
+    return "```json\n" + json.dumps(list(items), indent=2) + "\n```"
+
+
+def test_parses_fenced_array_with_preamble():
+    items, invalid = parse_insights("Here you go [as requested]:\n" + response(insight("One"), insight("Two")))
+
+    assert [item["title"] for item in items] == ["One", "Two"]
+    assert invalid == []
+    assert items[0]["action_items"] == [] and items[0]["recommended_sources"] == []
+
+
+def test_streamed_chunks_match_whole_response():
+    text = response(insight("One"), {"title": "Braces { and \" quotes ]", "key_insight": "k", "why_it_matters": "w"})
+    parser = InsightStreamParser()
+    streamed = []
+    for start in range(0, len(text), 7):
+        streamed += parser.feed(text[start:start + 7])
+    parser.finish()
+
+    assert streamed == parse_insights(text)[0]
+    assert streamed[1]["title"] == 'Braces { and " quotes ]'
+
+
+def test_invalid_objects_are_recorded_not_fatal():
+    text = '[{"title": "One", "key_insight": "k", "why_it_matters": "w"}, {"title": "Two" "key_insight": "k"},' \
+           ' {"title": "", "key_insight": "k", "why_it_matters": "w"},]'
+
+    items, invalid = parse_insights(text)
+
+    assert [item["title"] for item in items] == ["One"]
+    assert [position for position, _ in invalid] == [2, 3]
+    assert "malformed JSON" in invalid[0][1]
+    assert "missing or empty 'title'" in invalid[1][1]
+
+
+def test_string_list_fields_are_normalised():
+    items, _ = parse_insights(json.dumps([{**insight("One"), "action_items": "Just one", "search_terms": ["a", ""]}]))
+
+    assert items[0]["action_items"] == ["Just one"]
+    assert items[0]["search_terms"] == ["a"]
+
+
+def test_object_cut_off_is_recorded():
+    text = response(insight("One"), insight("Two"))
+    cut = text[:text.index('"Two insight"')]
+
+    parser = InsightStreamParser()
+    parser.feed(cut)
+    items = parser.finish()
+
+    assert [item["title"] for item in items] == ["One"]
+    assert parser.truncated
+    assert parser.invalid == [(2, "cut off before the object was complete")]
+
+
+def test_array_cut_off_between_objects_is_truncated():
+    text = response(insight("One"), insight("Two"))
+    parser = InsightStreamParser()
+    parser.feed(text[:text.index("},") + 2])
+    parser.finish()
+
+    assert parser.truncated
+    assert parser.invalid == []
+
+
+def test_complete_response_is_not_truncated():
+    parser = InsightStreamParser()
+    parser.feed(response(insight("One")))
+    parser.finish()
+
+    assert not parser.truncated
+
+
+@pytest.mark.parametrize("text, message", [
+    ("No insights today.", "did not contain a JSON array"),
+    ('[{"title": "One", "key_ins', "before the first complete insight"),
+])
+def test_unusable_responses_raise(text, message):
+    with pytest.raises(ValueError, match=message):
+        parse_insights(text)
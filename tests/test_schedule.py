@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+
+import pytest
+
+from newsletter_core import config
+from newsletter_core.archive import NewsletterArchive
+from newsletter_core.schedule import Scheduler
+
+TODAY = date(2025, 6, 1)
+
+
+class FailingJobs:
+    # Accepts every draft job but never archives a newsletter, like jobs that keep failing
+    def __init__(self, archive):
+        self.archive = archive
+        self.submitted = []
+
+    def submit(self, client, params):
+        self.submitted.append(params)
+        return f"job{len(self.submitted)}"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("newsletter_core.schedule.time.time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def scheduler(tmp_path, clock):
+    jobs = FailingJobs(NewsletterArchive(str(tmp_path / "archive.db")))
+    scheduler = Scheduler(str(tmp_path / "schedule.db"), jobs=jobs)
+    scheduler.save({"name": "Languages", "first_date": (TODAY + timedelta(days=1)).isoformat()})
+    return scheduler
+
+
+def test_failed_issue_waits_out_an_exponential_backoff(scheduler, clock):
+    assert len(scheduler.run_due(None, TODAY)) == 1
+    assert scheduler.due(TODAY) == []
+
+    clock[0] += config.SCHEDULE_POLL_SECONDS
+    assert len(scheduler.run_due(None, TODAY)) == 1
+
+    # The second retry waits twice as long
+    clock[0] += config.SCHEDULE_POLL_SECONDS
+    assert scheduler.due(TODAY) == []
+    clock[0] += config.SCHEDULE_POLL_SECONDS
+    assert len(scheduler.due(TODAY)) == 1
+
+
+def test_issue_is_given_up_after_max_attempts(scheduler, clock):
+    issue = TODAY + timedelta(days=1)
+    for _ in range(config.SCHEDULE_MAX_ATTEMPTS):
+        clock[0] += 10 ** 6
+        scheduler.run_due(None, TODAY)
+    clock[0] += 10 ** 6
+
+    assert scheduler.due(TODAY) == []
+    assert scheduler.gave_up("Languages", issue)
+    assert len(scheduler.jobs.submitted) == config.SCHEDULE_MAX_ATTEMPTS
+
+    # Saving the configuration again starts over
+    scheduler.save(scheduler.get("Languages"))
+    assert not scheduler.gave_up("Languages", issue)
+    assert len(scheduler.due(TODAY)) == 1
@@ -0,0 +1,123 @@
+import json
+from array import array
+
+from newsletter_core.dedup import signature
+from newsletter_core.storage import (
+    BODY_FORMAT,
+    StringTable,
+    decode_body,
+    encode_body,
+    pack_signature,
+    unpack_signature,
+)
+
+# Written by the first release of the compressed format; it must decode for as long as
+# BODY_FORMAT is 1, so ZDICT can never change without a new format byte
+FROZEN_BODY = bytes.fromhex(
+    "0178f9768faa9783fbc837b152c1c05047c1c8c0c814cd7720215d0320320c31b0b43230002225d43033440b34a3581d2c7181"
+    "cbffc1b9c0b84c2d52c8cd4f4905c6297a683867a42616a416610b14e7fce2122c01135254a9909f978a2d648a737271878c71"
+    "6c6d2c464cd60200eee65ff3"
+)
+
+
+def make_newsletter(title="Smaller models win on cost", team=None):
+    newsletter = {
+        "date": "May 01, 2025",
+        "timestamp": "2025-05-01T09:00:00",
+        "ai_topics": ["Multilingual AI", "Voice AI & Multimodal"],
+        "pm_topics": ["Product Strategy"],
+        "team_context": "Voice assistants in 12 languages — ünïcode included",
+        "ai_articles": [
+            {
+                "title": title,
+                "key_insight": "Distilled models now match larger ones on routine support intents.",
+                "why_it_matters": "Serving cost drops while quality holds.",
+                "action_items": ["Benchmark a small model", "Compare cost per intent"],
+                "search_terms": ["model distillation"],
+                "recommended_sources": ["TechCrunch", "The Verge"],
+            }
+        ],
+        "pm_articles": [
+            {
+                "title": "Write the press release first",
+                "key_insight": "Working backwards keeps the team on the customer outcome.",
+                "why_it_matters": "Scope creep shows up before any code is written.",
+                "action_items": ["Draft a one-page release"],
+                "search_terms": ["working backwards"],
+                "recommended_sources": [],
+            }
+        ],
+        "metrics": {"stages": {"prompts": 1.2, "total": 950.0}, "sections": {}, "tokens": {}},
+    }
+    if team:
+        newsletter["team"] = team
+    return newsletter
+
+
+def test_body_round_trip(tmp_path):
+    strings = StringTable(str(tmp_path / "archive.db"))
+    newsletter = make_newsletter(team="Languages")
+
+    body = encode_body({**newsletter, "id": 7}, strings)
+
+    assert body.startswith(BODY_FORMAT)
+    assert len(body) < len(json.dumps(newsletter))
+    assert decode_body(body, strings) == newsletter
+
+
+def test_decoded_strings_are_shared(tmp_path):
+    strings = StringTable(str(tmp_path / "archive.db"))
+    first = decode_body(encode_body(make_newsletter(), strings), strings)
+    second = decode_body(encode_body(make_newsletter(title="Another one"), strings), strings)
+
+    assert first["ai_topics"][0] is second["ai_topics"][0]
+    assert first["ai_articles"][0]["recommended_sources"][0] is second["ai_articles"][0]["recommended_sources"][0]
+
+
+def test_string_table_sees_strings_added_elsewhere(tmp_path):
+    path = str(tmp_path / "archive.db")
+    writer, reader = StringTable(path), StringTable(path)
+
+    body = encode_body(make_newsletter(), writer)
+
+    assert decode_body(body, reader) == make_newsletter()
+
+
+def test_frozen_body_still_decodes(tmp_path):
+    strings = StringTable(str(tmp_path / "archive.db"))
+    strings.ids(["Multilingual AI", "Product Strategy", "TechCrunch"])
+
+    assert decode_body(FROZEN_BODY, strings) == {
+        "date": "May 01, 2025",
+        "timestamp": "2025-05-01T09:00:00",
+        "ai_topics": ["Multilingual AI"],
+        "pm_topics": ["Product Strategy"],
+        "team_context": "",
+        "ai_articles": [
+            {
+                "title": "Smaller models",
+                "key_insight": "Cheaper",
+                "why_it_matters": "Cost",
+                "action_items": ["Try one"],
+                "search_terms": ["slm"],
+                "recommended_sources": ["TechCrunch"],
+            }
+        ],
+        "pm_articles": [],
+    }
+
+
+def test_signature_round_trip():
+    sig = signature("Distilled models now match larger ones on routine support intents")
+
+    packed = pack_signature(sig)
+
+    assert len(packed) == 8 * len(sig)
+    assert unpack_signature(packed) == array("Q", sig)
+
+
+def test_packed_signature_is_little_endian():
+    packed = pack_signature([1, 2 ** 60])
+
+    assert packed == (1).to_bytes(8, "little") + (2 ** 60).to_bytes(8, "little")
+    assert list(unpack_signature(packed)) == [1, 2 ** 60]